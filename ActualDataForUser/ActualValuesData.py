@@ -1,21 +1,46 @@
+import sys
+import time
+from array import array
 from dataclasses import dataclass
-from typing import List, Dict, Union
+from typing import Iterator, List, Dict, Optional, Tuple, Union
 
-@dataclass
+@dataclass(slots=True)
 class HashedValue:
     tag: str
     timestamp: int
     value: float
 
 class ValuesDataContainer:
-    __slots__ = "values_dict"
+    # version/versions/epoch - як у CompactValuesContainer: номер останньої зміни кожного тегу
+    __slots__ = ("values_dict", "versions", "version", "epoch")
 
     def __init__(self):
         self.values_dict = {}
+        self.versions: Dict[str, int] = {}
+        self.version = 0
+        # Мікросекунди старту процесу: вміщується в число JavaScript без втрати точності
+        self.epoch = time.time_ns() // 1000
 
     def update_values(self, values: list):
+        self.version += 1
         for item in values:
             self.values_dict[item.tag] = item
+            self.versions[item.tag] = self.version
+
+    def update_columns(self, tags: List[str], timestamps, values) -> None:
+        self.update_values([HashedValue(*row) for row in zip(tags, timestamps, values)])
+
+    def load(self, tags: List[str], timestamps_bytes, values_bytes) -> None:
+        # Заміна всього вмісту (warm start зі знімка)
+        timestamps = array("q")
+        timestamps.frombytes(timestamps_bytes)
+        values = array("d")
+        values.frombytes(values_bytes)
+        if len(timestamps) != len(tags) or len(values) != len(tags):
+            raise ValueError("Snapshot columns do not match tags count")
+        self.values_dict = {}
+        self.versions = {}
+        self.update_columns(tags, timestamps, values)
 
     def get_value(self, tag: str) -> Union[HashedValue, None]:
         return self.values_dict.get(tag)
@@ -27,8 +52,162 @@ class ValuesDataContainer:
                 result[tag] = self.values_dict[tag]
         return result
 
+    def get_tags(self) -> List[str]:
+        return list(self.values_dict)
+
     def get_all_values(self) -> list:
         result = []
         for key, value in self.values_dict.items():
             result.append(value)
-        return result
\ No newline at end of file
+        return result
+
+    def changed_since(self, since: int, tags: Optional[List[str]] = None) -> List[HashedValue]:
+        if tags is None:
+            tags = self.versions
+        return [self.values_dict[tag] for tag in tags if self.versions.get(tag, 0) > since]
+
+    def snapshot(self) -> Tuple[List[str], memoryview, memoryview]:
+        # Тут це копія в масиви; значення, що не є числом, у знімок не потрапляють
+        items = [item for item in self.values_dict.values() if is_valid_value(item)]
+        return ([item.tag for item in items], memoryview(array("q", [int(item.timestamp) for item in items])),
+                memoryview(array("d", [item.value for item in items])))
+
+    def __len__(self) -> int:
+        return len(self.values_dict)
+
+
+def is_valid_value(item) -> bool:
+    # Що можна покласти в array('q') / array('d') без втрат: ціле timestamp і числове value
+    timestamp, value = item.timestamp, item.value
+    if isinstance(timestamp, float):
+        if not timestamp.is_integer():
+            return False
+    elif not isinstance(timestamp, int) or isinstance(timestamp, bool):
+        return False
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+class CompactValuesContainer:
+    """
+    Той самий інтерфейс, що й ValuesDataContainer, але без об'єкта на тег:
+    tag (інтернований) -> номер слота, timestamp і value лежать у суцільних array('q') / array('d').
+    Оновлення переписує числа на місці, HashedValue створюється лише при читанні.
+
+    Кожна пачка оновлень отримує наступний номер version, слот пам'ятає номер останньої зміни -
+    клієнт, що перепідключився, просить лише змінене після відомої йому версії (changed_since).
+    epoch відрізняє цей процес від попереднього запуску: версії з іншої епохи непорівнянні.
+    """
+    __slots__ = ("slots", "tags", "timestamps", "values", "versions", "size", "version", "epoch")
+
+    def __init__(self, capacity: int = 1024):
+        self.slots: Dict[str, int] = {}
+        self.tags: List[str] = []
+        self.timestamps = array("q", bytes(8 * capacity))
+        self.values = array("d", bytes(8 * capacity))
+        self.versions = array("q", bytes(8 * capacity))
+        self.size = 0
+        self.version = 0
+        # Мікросекунди старту процесу: вміщується в число JavaScript без втрати точності
+        self.epoch = time.time_ns() // 1000
+
+    def _add(self, tag: str) -> int:
+        slot = self.size
+        if slot == len(self.timestamps):
+            self._grow()
+        tag = sys.intern(tag)
+        self.slots[tag] = slot
+        self.tags.append(tag)
+        self.size += 1
+        return slot
+
+    def _grow(self) -> None:
+        # Нові масиви замість розширення на місці: memoryview зі snapshot() тримає старий буфер
+        capacity = len(self.timestamps) * 2 or 1024
+        timestamps = array("q", bytes(8 * capacity))
+        values = array("d", bytes(8 * capacity))
+        versions = array("q", bytes(8 * capacity))
+        timestamps[:self.size] = self.timestamps[:self.size]
+        values[:self.size] = self.values[:self.size]
+        versions[:self.size] = self.versions[:self.size]
+        self.timestamps, self.values, self.versions = timestamps, values, versions
+
+    def update_values(self, values: list):
+        # Уся пачка перевіряється до запису: інакше частина тегів оновиться, а решта лишиться 0.0
+        bad = [item.tag for item in values if not is_valid_value(item)]
+        if bad:
+            raise ValueError(f"Non-numeric value or non-integer timestamp for tags: {bad[:10]}")
+        self.version += 1
+        version = self.version
+        slots, timestamps, numbers, versions = self.slots, self.timestamps, self.values, self.versions
+        for item in values:
+            slot = slots.get(item.tag)
+            if slot is None:
+                slot = self._add(item.tag)
+                timestamps, numbers, versions = self.timestamps, self.values, self.versions
+            timestamps[slot] = int(item.timestamp)
+            numbers[slot] = item.value
+            versions[slot] = version
+
+    def update_columns(self, tags: List[str], timestamps, values) -> None:
+        # Пакетне оновлення без HashedValue (наприклад, з розпакованого бінарного кадру)
+        self.update_values([HashedValue(*row) for row in zip(tags, timestamps, values)])
+
+    def load(self, tags: List[str], timestamps_bytes, values_bytes) -> None:
+        # Заміна всього вмісту (warm start зі знімка): числа копіюються з буфера одним викликом
+        self.tags = [sys.intern(tag) for tag in tags]
+        self.slots = {tag: slot for slot, tag in enumerate(self.tags)}
+        self.size = len(self.tags)
+        self.timestamps = array("q")
+        self.timestamps.frombytes(timestamps_bytes)
+        self.values = array("d")
+        self.values.frombytes(values_bytes)
+        if len(self.timestamps) != self.size or len(self.values) != self.size:
+            raise ValueError("Snapshot columns do not match tags count")
+        # Запас під нові теги, як у _grow
+        spare = max(self.size, 1024)
+        self.timestamps.frombytes(bytes(8 * spare))
+        self.values.frombytes(bytes(8 * spare))
+        # Завантажений стан - одна зміна для клієнтів цієї епохи
+        self.version += 1
+        self.versions = array("q", [self.version]) * self.size
+        self.versions.frombytes(bytes(8 * spare))
+
+    def get_value(self, tag: str) -> Union[HashedValue, None]:
+        slot = self.slots.get(tag)
+        if slot is None:
+            return None
+        return HashedValue(self.tags[slot], self.timestamps[slot], self.values[slot])
+
+    def get_many_values(self, tags: List[str]) -> Dict[str, HashedValue]:
+        result = {}
+        for tag in tags:
+            slot = self.slots.get(tag)
+            if slot is not None:
+                result[tag] = HashedValue(self.tags[slot], self.timestamps[slot], self.values[slot])
+        return result
+
+    def get_tags(self) -> List[str]:
+        return list(self.tags)
+
+    def get_all_values(self) -> list:
+        return list(self.iter_values())
+
+    def iter_values(self) -> Iterator[HashedValue]:
+        return map(HashedValue, self.tags, self.timestamps[:self.size], self.values[:self.size])
+
+    def changed_since(self, since: int, tags: Optional[List[str]] = None) -> List[HashedValue]:
+        # Значення, змінені після версії since; tags = None - по всіх тегах
+        versions, timestamps, values = self.versions, self.timestamps, self.values
+        if tags is None:
+            slots = [slot for slot in range(self.size) if versions[slot] > since]
+        else:
+            slots = [slot for slot in map(self.slots.get, tags) if slot is not None and versions[slot] > since]
+        return [HashedValue(self.tags[slot], timestamps[slot], values[slot]) for slot in slots]
+
+    def snapshot(self) -> Tuple[List[str], memoryview, memoryview]:
+        # Без копіювання: (теги за слотами, timestamps, values). Подання "живі" -
+        # наступні оновлення видно в них, тож споживати треба без await між читаннями
+        return list(self.tags), memoryview(self.timestamps)[:self.size], memoryview(self.values)[:self.size]
+
+    def __len__(self) -> int:
+        return self.size
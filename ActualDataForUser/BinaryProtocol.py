@@ -0,0 +1,95 @@
+import struct
+import time
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.future import select
+
+from DataBase.database import AsyncSessionLocal
+from DataBase.models import Values
+
+# Один семпл: id тегу (uint32), timestamp (int64), value (float64), little-endian, 20 байт
+SAMPLE = struct.Struct("<Iqd")
+SAMPLE_FORMAT = "<Iqd"
+
+# Тегам без рядка у value_items сервер видає тимчасові id з цього діапазону
+EPHEMERAL_ID_START = 2 ** 31
+
+
+class TagIdRegistry:
+    """
+    tag <-> числовий id для бінарного протоколу. Основні id - Values.id,
+    для тегів, яких немає в БД, видаються тимчасові (живуть до перезапуску).
+    """
+    __slots__ = ("tag_to_id", "id_to_tag", "next_ephemeral", "loaded", "loaded_at")
+
+    def __init__(self):
+        self.tag_to_id: Dict[str, int] = {}
+        self.id_to_tag: Dict[int, str] = {}
+        self.next_ephemeral = EPHEMERAL_ID_START
+        self.loaded = False
+        self.loaded_at = 0.0
+
+    async def load(self) -> None:
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(select(Values.id, Values.tag).where(Values.tag.is_not(None)))
+            for value_id, tag in result.all():
+                self.add(value_id, tag)
+        self.loaded = True
+        self.loaded_at = time.monotonic()
+
+    async def refresh(self, min_interval: float = 5.0) -> bool:
+        # Перечитати Values, якщо прийшов невідомий id (рядок могли додати в обхід /values);
+        # не частіше ніж раз на min_interval, щоб кривий продюсер не навантажував БД
+        if time.monotonic() - self.loaded_at < min_interval:
+            return False
+        await self.load()
+        return True
+
+    def add(self, value_id: int, tag: Optional[str]) -> None:
+        # Рядок Values створено або змінено його tag
+        old_tag = self.id_to_tag.get(value_id)
+        if old_tag is not None and old_tag != tag and self.tag_to_id.get(old_tag) == value_id:
+            del self.tag_to_id[old_tag]
+        if tag is None:
+            self.id_to_tag.pop(value_id, None)
+            return
+        self.tag_to_id[tag] = value_id
+        self.id_to_tag[value_id] = tag
+
+    def forget(self, value_id: int) -> None:
+        self.add(value_id, None)
+
+    def get_id(self, tag: str) -> int:
+        tag_id = self.tag_to_id.get(tag)
+        if tag_id is None:
+            tag_id = self.next_ephemeral
+            self.next_ephemeral += 1
+            self.tag_to_id[tag] = tag_id
+            self.id_to_tag[tag_id] = tag
+        return tag_id
+
+    def get_tag(self, tag_id: int) -> Optional[str]:
+        return self.id_to_tag.get(tag_id)
+
+
+def pack_sample(tag_id: int, timestamp: int, value: float) -> bytes:
+    return SAMPLE.pack(tag_id, int(timestamp), float(value))
+
+
+def unpack_samples(data: bytes, registry: TagIdRegistry) -> Tuple[List[dict], List[int]]:
+    # Повертає семпли з відомими id і список невідомих id (їх не можна мовчки відкидати)
+    if len(data) % SAMPLE.size:
+        raise ValueError(f"Binary frame length {len(data)} is not a multiple of {SAMPLE.size}")
+    samples = []
+    unknown = []
+    for tag_id, timestamp, value in SAMPLE.iter_unpack(data):
+        tag = registry.get_tag(tag_id)
+        if tag is None:
+            unknown.append(tag_id)
+        else:
+            samples.append({"tag": tag, "timestamp": timestamp, "value": value})
+    return samples, unknown
+
+
+# Один реєстр на процес: його завантажує main.py при старті, а ValuesRouter оновлює при змінах Values
+tag_ids = TagIdRegistry()
@@ -0,0 +1,20 @@
+from typing import Optional, Tuple
+
+
+def check_int(name: str, value, minimum: Optional[int] = None) -> Optional[int]:
+    # Числові поля з JSON клієнта: None - не задано; bool, рядки і дробові числа відхиляються
+    if value is None:
+        return None
+    if not isinstance(value, int) or isinstance(value, bool):
+        raise ValueError(f"{name} must be an integer, got {value!r}")
+    if minimum is not None and value < minimum:
+        raise ValueError(f"{name} must be >= {minimum}, got {value}")
+    return value
+
+
+def resume_point(data: dict) -> Tuple[int, Optional[int]]:
+    # {"since": N, "epoch": E} -> (since, epoch); ValueError, якщо поля не цілі
+    since = check_int("since", data.get("since"), 0)
+    if since is None:
+        raise ValueError("since must be an integer, got None")
+    return since, check_int("epoch", data.get("epoch"))
@@ -0,0 +1,188 @@
+import asyncio
+import math
+from collections import deque
+from typing import Any, Callable, Dict, Optional
+
+# Що робити, коли черга клієнта заповнена:
+#   drop_oldest - викинути найстаріше оновлення
+#   coalesce    - злити всі оновлення в черзі в одне (по тегу лишається останнє значення)
+#   disconnect  - від'єднати клієнта
+SLOW_CLIENT_POLICIES = ("drop_oldest", "coalesce", "disconnect")
+
+UPDATE = 0
+MESSAGE = 1
+
+# Найменший max_rate_ms: частіше злиті повідомлення вже не економлять відправок
+MIN_RATE_MS = 20
+
+
+class ClientSender:
+    """
+    Вихідна черга одного websocket-клієнта з власною задачею відправки.
+    Продюсер лише кладе оновлення в чергу (без await), тому повільний клієнт
+    не гальмує ні продюсера, ні інших клієнтів.
+
+    Оновлення - dict tag -> payload; render перетворює його на JSON-повідомлення,
+    merge зливає два оновлення при coalesce (за замовчуванням - останнє значення тегу).
+    Для оновлення можна передати вже готовий кадр (frame), спільний для кількох клієнтів -
+    тоді render не викликається, доки оновлення не злили з іншими.
+    Службові повідомлення (відповіді на get тощо) ніколи не відкидаються і не зливаються;
+    якщо їх у черзі більше за max_messages, клієнт не читає - його від'єднано.
+
+    Якщо задано max_rate_ms, оновлення накопичуються (останнє значення по тегу)
+    і відправляються одним повідомленням не частіше ніж раз на max_rate_ms.
+    """
+
+    def __init__(self, websocket, render: Callable[[Dict[str, Any]], Any], max_queue: int = 256,
+                 policy: str = "drop_oldest", on_close: Optional[Callable[[Any], None]] = None,
+                 merge: Callable[[Dict[str, Any], Dict[str, Any]], None] = dict.update,
+                 max_messages: int = 1024):
+        if policy not in SLOW_CLIENT_POLICIES:
+            raise ValueError(f"Unknown slow client policy: {policy}")
+        self.websocket = websocket
+        self.render = render
+        self.max_queue = max_queue
+        self.max_messages = max_messages
+        self.policy = policy
+        self.on_close = on_close
+        self.merge = merge
+        self.queue: deque = deque()
+        self.updates_in_queue = 0
+        self.messages_in_queue = 0
+        self.dropped = 0
+        self.closed = False
+        self.max_rate_ms = 0
+        self.pending: Dict[str, Any] = {}
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+        self._rate_task: Optional[asyncio.Task] = None
+        self._close_task: Optional[asyncio.Task] = None
+
+    def set_render(self, render: Callable[[Dict[str, Any]], Any]) -> None:
+        # Зміна формату (наприклад, JSON -> бінарний): оновлення в старому форматі вже не придатні
+        self.render = render
+        self.pending = {}
+        self.queue = deque(entry for entry in self.queue if entry[0] != UPDATE)
+        self.updates_in_queue = 0
+
+    def set_rate(self, max_rate_ms) -> None:
+        # 0 або None - без обмеження; менші за MIN_RATE_MS значення піднімаються до нього
+        if max_rate_ms is None:
+            max_rate_ms = 0
+        if isinstance(max_rate_ms, bool) or not isinstance(max_rate_ms, (int, float)) \
+                or not math.isfinite(max_rate_ms) or max_rate_ms < 0:
+            raise ValueError(f"max_rate_ms must be a non-negative number, got {max_rate_ms!r}")
+        self.max_rate_ms = max(int(max_rate_ms), MIN_RATE_MS) if max_rate_ms else 0
+        if self.max_rate_ms and (self._rate_task is None or self._rate_task.done()):
+            self._rate_task = asyncio.create_task(self._rate_loop())
+        elif not self.max_rate_ms:
+            if self._rate_task:
+                self._rate_task.cancel()
+                self._rate_task = None
+            self._flush_pending()
+
+    def push_update(self, items: Dict[str, Any], frame: Optional[str] = None) -> None:
+        if self.closed:
+            return
+        if self.max_rate_ms:
+            self.merge(self.pending, items)
+            return
+        self._enqueue_update(items, frame)
+
+    def _enqueue_update(self, items: Dict[str, Any], frame: Optional[str] = None) -> None:
+        if self.updates_in_queue >= self.max_queue:
+            if self.policy == "disconnect":
+                self._schedule_close(1013)
+                return
+            if self.policy == "drop_oldest":
+                self._drop_oldest_update()
+            else:
+                self._coalesce_updates()
+        self.queue.append((UPDATE, items, frame))
+        self.updates_in_queue += 1
+        self._wakeup.set()
+
+    def push_message(self, message: Any) -> None:
+        if self.closed:
+            return
+        if self.messages_in_queue >= self.max_messages:
+            self._schedule_close(1013)
+            return
+        self.queue.append((MESSAGE, message, None))
+        self.messages_in_queue += 1
+        self._wakeup.set()
+
+    def _schedule_close(self, code: int = 1000) -> None:
+        # Посилання на задачу тримаємо, щоб її не прибрав збирач сміття до завершення
+        if self._close_task is None:
+            self._close_task = asyncio.create_task(self.close(code=code))
+
+    async def close(self, code: int = 1000) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        self._task.cancel()
+        if self._rate_task:
+            self._rate_task.cancel()
+        try:
+            await self.websocket.close(code=code)
+        except Exception:
+            pass
+        if self.on_close:
+            self.on_close(self.websocket)
+
+    def _flush_pending(self) -> None:
+        if self.pending:
+            pending, self.pending = self.pending, {}
+            self._enqueue_update(pending)
+
+    async def _rate_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.max_rate_ms / 1000)
+            self._flush_pending()
+
+    def _drop_oldest_update(self) -> None:
+        for i, (kind, _, _) in enumerate(self.queue):
+            if kind == UPDATE:
+                del self.queue[i]
+                self.updates_in_queue -= 1
+                self.dropped += 1
+                return
+
+    def _coalesce_updates(self) -> None:
+        # Усі оновлення зливаються в одне в кінці черги, службові повідомлення лишаються як є
+        merged: Dict[str, Any] = {}
+        kept = deque()
+        for kind, data, frame in self.queue:
+            if kind == UPDATE:
+                self.merge(merged, data)
+            else:
+                kept.append((kind, data, frame))
+        kept.append((UPDATE, merged, None))
+        self.dropped += self.updates_in_queue - 1
+        self.queue = kept
+        self.updates_in_queue = 1
+
+    async def _run(self) -> None:
+        try:
+            while True:
+                await self._wakeup.wait()
+                self._wakeup.clear()
+                while self.queue:
+                    kind, data, frame = self.queue.popleft()
+                    if kind == UPDATE:
+                        self.updates_in_queue -= 1
+                        data = frame if frame is not None else self.render(data)
+                    else:
+                        self.messages_in_queue -= 1
+                    if isinstance(data, str):
+                        await self.websocket.send_text(data)
+                    elif isinstance(data, bytes):
+                        await self.websocket.send_bytes(data)
+                    else:
+                        await self.websocket.send_json(data)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # Клієнт від'єднався або завис - прибираємо його
+            self._schedule_close()
@@ -1,22 +1,36 @@
+import time
 from dataclasses import dataclass
 from typing import List, Dict, Union, Optional
 
 class EventDataContainer:
-    __slots__ = "events_dict"
+    # version/versions/epoch - як у CompactValuesContainer: номер останньої зміни кожного тегу
+    __slots__ = ("events_dict", "versions", "version", "epoch")
 
     def __init__(self):
         self.events_dict: Dict[str, Dict[int, float]] = {}
+        self.versions: Dict[str, int] = {}
+        self.version = 0
+        # Мікросекунди старту процесу: вміщується в число JavaScript без втрати точності
+        self.epoch = time.time_ns() // 1000
 
     def update_event(self, events: Dict[str, Dict[int, float]]) -> None:
+        self.version += 1
         for eventType, eventDict in events.items():
             if eventType not in self.events_dict:
                 self.events_dict[eventType] = eventDict
             else:
                 for eventEnum, eventStatus in eventDict.items():  # додали .items()
                     self.events_dict[eventType][eventEnum] = eventStatus
+            self.versions[eventType] = self.version
 
     def get_event(self, tag: str) -> Dict[int, float]:
         return self.events_dict.get(tag, {})
 
     def get_all_events(self) -> Dict[str, Dict[int, float]]:
-        return self.events_dict
\ No newline at end of file
+        return self.events_dict
+
+    def changed_since(self, since: int, tags: Optional[List[str]] = None) -> Dict[str, Dict[int, float]]:
+        # Стан тегів, змінених після версії since; tags = None - по всіх тегах
+        if tags is None:
+            tags = self.versions
+        return {tag: self.events_dict[tag] for tag in tags if self.versions.get(tag, 0) > since}
@@ -0,0 +1,14 @@
+import json
+
+# orjson - опційно: у кілька разів швидший за json і одразу дає компактний вивід
+try:
+    import orjson
+
+    def dumps(obj) -> str:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+
+except ImportError:
+    orjson = None
+
+    def dumps(obj) -> str:
+        return json.dumps(obj, separators=(",", ":"))
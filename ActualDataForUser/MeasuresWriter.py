@@ -0,0 +1,179 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from sqlalchemy.future import select
+
+from DataBase.database import AsyncSessionLocal
+from DataBase.models import Values
+from Routers.crud import get_value_settings
+from Routers.measures_query import insert_measures
+
+
+@dataclass
+class WriterStats:
+    enqueued: int = 0
+    written: int = 0
+    dropped: int = 0
+    failed: int = 0
+    flushes: int = 0
+    last_flush_time: float = 0.0
+
+
+class MeasuresWriter:
+    """
+    Write-behind запис живих значень у таблицю measures.
+    Значення логованих тегів (Values.settings.isLoging) кладуться в обмежену чергу,
+    фонова задача скидає її в БД пачками за часом або за розміром.
+    """
+
+    def __init__(self, max_queue: int = 100_000, batch_size: int = 5000,
+                 flush_interval: float = 1.0, put_timeout: float = 0.05,
+                 tags_refresh_interval: float = 60.0):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self.tags_refresh_interval = tags_refresh_interval
+        self.logged_tags: Dict[str, int] = {}
+        self.stats = WriterStats()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._tags_task: Optional[asyncio.Task] = None
+        # Пачка, яку вже взяли з черги, але ще не віддали в _flush (при зупинці)
+        self._unflushed: List[dict] = []
+        # Запис, що йде зараз: зупинка чекає на нього, а не перериває
+        self._inflight: Optional[asyncio.Future] = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._flush_task is not None and not self._flush_task.done()
+
+    async def start(self) -> None:
+        await self.refresh_logged_tags()
+        self._flush_task = asyncio.create_task(self._flush_loop())
+        self._tags_task = asyncio.create_task(self._tags_loop())
+
+    async def stop(self) -> None:
+        for task in (self._tags_task, self._flush_task):
+            if task:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        if self._inflight:
+            await self._inflight
+        # Дописуємо недозібрану пачку і те, що залишилось у черзі
+        rows, self._unflushed = self._unflushed, []
+        await self._flush(rows + self._drain(self.queue.qsize()))
+
+    async def refresh_logged_tags(self) -> None:
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(
+                select(Values.id, Values.tag, Values.settings).where(Values.tag.is_not(None))
+            )
+            logged = {}
+            for value_id, tag, settings in result.all():
+                try:
+                    if get_value_settings(settings).get('isLoging') == True:
+                        logged[tag] = value_id
+                except Exception as e:
+                    print(f"Error parsing settings for value {value_id}: {e}")
+        self.logged_tags = logged
+
+    async def offer(self, values: list) -> None:
+        """
+        Відбирає логовані значення і ставить їх у чергу. Якщо черга повна, продюсер
+        чекає (backpressure), але сумарно не довше put_timeout на всю пачку -
+        після цього решта значень пачки, що не влазить, відкидається.
+        """
+        if not self.is_running:
+            return
+        deadline = None
+        for v in values:
+            value_id = self.logged_tags.get(v.tag)
+            if value_id is None:
+                continue
+            row = {"valueId": value_id, "measureValue": v.value, "measureTime": v.timestamp}
+            try:
+                self.queue.put_nowait(row)
+            except asyncio.QueueFull:
+                if deadline is None:
+                    deadline = time.monotonic() + self.put_timeout
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    self.stats.dropped += 1
+                    continue
+                try:
+                    await asyncio.wait_for(self.queue.put(row), timeout)
+                except asyncio.TimeoutError:
+                    self.stats.dropped += 1
+                    continue
+            self.stats.enqueued += 1
+
+    def get_stats(self) -> dict:
+        return {
+            "running": self.is_running,
+            "queued": self.queue.qsize(),
+            "max_queue": self.queue.maxsize,
+            "logged_tags": len(self.logged_tags),
+            **self.stats.__dict__
+        }
+
+    def _drain(self, limit: int) -> List[dict]:
+        rows = []
+        while len(rows) < limit:
+            try:
+                rows.append(self.queue.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+        return rows
+
+    async def _flush(self, rows: List[dict]) -> None:
+        if not rows:
+            return
+        try:
+            async with AsyncSessionLocal() as session:
+                self.stats.written += await insert_measures(rows, session)
+        except Exception as e:
+            self.stats.failed += len(rows)
+            print(f"Error flushing {len(rows)} measures: {e}")
+        self.stats.flushes += 1
+        self.stats.last_flush_time = time.time()
+
+    async def _flush_loop(self) -> None:
+        while True:
+            rows = []
+            try:
+                # Чекаємо перший рядок, далі добираємо пачку до batch_size або до flush_interval
+                rows.append(await self.queue.get())
+                deadline = time.monotonic() + self.flush_interval
+                while len(rows) < self.batch_size:
+                    rows.extend(self._drain(self.batch_size - len(rows)))
+                    timeout = deadline - time.monotonic()
+                    if len(rows) >= self.batch_size or timeout <= 0:
+                        break
+                    try:
+                        rows.append(await asyncio.wait_for(self.queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+            except asyncio.CancelledError:
+                # Зупинка під час збирання пачки - рядки допише stop()
+                self._unflushed.extend(rows)
+                raise
+            # Скасування циклу не перериває запис, що вже почався
+            self._inflight = asyncio.ensure_future(self._flush(rows))
+            try:
+                await asyncio.shield(self._inflight)
+            finally:
+                if self._inflight.done():
+                    self._inflight = None
+
+    async def _tags_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.tags_refresh_interval)
+            try:
+                await self.refresh_logged_tags()
+            except Exception as e:
+                print(f"Error refreshing logged tags: {e}")
@@ -0,0 +1,100 @@
+import asyncio
+from typing import List, Optional
+
+from ActualDataForUser.ClientSender import ClientSender
+from ActualDataForUser.FastJson import dumps
+
+# Як підтверджувати оновлення продюсера:
+#   each    - текст "Values updated successfully" на кожне оновлення (за замовчуванням, як раніше)
+#   none    - без підтверджень
+#   batched - раз на interval_ms одне накопичене {"ack": останній seq, "lost": [[з, по], ...]}
+ACK_MODES = ("each", "none", "batched")
+ACK_TEXT = "Values updated successfully"
+# Скільки діапазонів втрат тримати між двома ack; далі нові пропуски зливаються з останнім
+# діапазоном (він може захопити й отримані номери) і ack позначається "lost_merged": true
+MAX_LOST_RANGES = 100
+
+
+class ProducerAcks:
+    """
+    Підтвердження оновлень одного продюсера. Продюсер нумерує оновлення полем "seq"
+    і шле їх без очікування відповіді; пропуски в нумерації повертаються в "lost".
+    Оновлення без seq (зокрема бінарні кадри) нумеруються сервером по порядку.
+    """
+
+    def __init__(self, sender: ClientSender):
+        self.sender = sender
+        self.mode = "each"
+        self.interval_ms = 200
+        self.last_seq = 0
+        self.acked_seq = 0
+        self.lost: List[List[int]] = []
+        self.lost_merged = False
+        self._task: Optional[asyncio.Task] = None
+
+    def configure(self, mode: str, interval_ms: int = 200) -> None:
+        if mode not in ACK_MODES:
+            raise ValueError(f"Unknown ack mode: {mode}")
+        self.flush()
+        self.mode = mode
+        self.interval_ms = max(int(interval_ms), 10)
+        if mode == "batched" and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._loop())
+        elif mode != "batched" and self._task:
+            self._task.cancel()
+            self._task = None
+
+    def negotiate(self, options) -> None:
+        # {"producer": {"ack": "batched", "ack_interval_ms": 200}} -> підтвердження режиму або помилка
+        if not isinstance(options, dict):
+            self.sender.push_message(dumps({"error": "producer options must be an object"}))
+            return
+        try:
+            self.configure(options.get("ack", "each"), options.get("ack_interval_ms", self.interval_ms))
+        except (ValueError, TypeError) as e:
+            self.sender.push_message(dumps({"error": str(e)}))
+            return
+        self.sender.push_message(dumps({
+            "producer": {"ack": self.mode, "ack_interval_ms": self.interval_ms, "last_seq": self.last_seq}
+        }))
+
+    def check_seq(self, seq) -> bool:
+        # Викликається до застосування оновлення: з кривим seq оновлення відхиляється з помилкою
+        if seq is None or (isinstance(seq, int) and not isinstance(seq, bool) and seq > 0):
+            return True
+        self.sender.push_message(dumps({"error": "seq must be a positive integer", "seq": seq}))
+        return False
+
+    def received(self, seq: Optional[int] = None) -> None:
+        if seq is None:
+            seq = self.last_seq + 1
+        if seq > self.last_seq + 1:
+            if len(self.lost) < MAX_LOST_RANGES:
+                self.lost.append([self.last_seq + 1, seq - 1])
+            else:
+                self.lost[-1][1] = seq - 1
+                self.lost_merged = True
+        # Повтори і запізнілі номери не відкочують лічильник
+        self.last_seq = max(self.last_seq, seq)
+        if self.mode == "each":
+            self.sender.push_message(ACK_TEXT)
+
+    def flush(self) -> None:
+        if self.mode != "batched" or (self.last_seq == self.acked_seq and not self.lost):
+            return
+        ack = {"ack": self.last_seq, "lost": self.lost}
+        if self.lost_merged:
+            ack["lost_merged"] = True
+        self.sender.push_message(dumps(ack))
+        self.acked_seq = self.last_seq
+        self.lost = []
+        self.lost_merged = False
+
+    def close(self) -> None:
+        if self._task:
+            self._task.cancel()
+
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval_ms / 1000)
+            self.flush()
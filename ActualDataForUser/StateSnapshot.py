@@ -0,0 +1,231 @@
+#StateSnapshot.py
+# Знімки живого стану для швидкого старту після перезапуску.
+# Файли пишуться у тимчасовий файл, fsync, потім атомарний rename - після збою лишається
+# або старий, або новий знімок, але не половина. Формат читається через mmap без розбору:
+#   values.snap: HEADER(MAGIC_VALUES, count, crc32) | timestamps int64[count] | values float64[count] | теги через \0
+#   events.snap: HEADER(MAGIC_EVENTS, entries, crc32) | enums int64[entries] | statuses float64[entries]
+#                | tags_count:uint32 | entries_per_tag uint32[tags_count] | теги через \0
+# crc32 рахується від усього, що після заголовка.
+import asyncio
+import mmap
+import os
+import struct
+import time
+import zlib
+from array import array
+from typing import Dict, List, Optional
+
+from sqlalchemy import and_, func
+from sqlalchemy.future import select
+
+from ActualDataForUser.ActualValuesData import CompactValuesContainer, ValuesDataContainer
+from ActualDataForUser.EventsData import EventDataContainer
+from DataBase.database import AsyncSessionLocal
+from DataBase.models import Measures
+
+MAGIC_VALUES = b"LVS1"
+MAGIC_EVENTS = b"LES1"
+HEADER = struct.Struct("<4sIIq")
+VALUES_FILE = "values.snap"
+EVENTS_FILE = "events.snap"
+SEPARATOR = "\0"
+
+
+def _atomic_write(path: str, magic: bytes, count: int, blocks: List[bytes]) -> None:
+    crc = 0
+    for block in blocks:
+        crc = zlib.crc32(block, crc)
+    # Воркери з liveStateBackend = "worker_bus" пишуть той самий знімок - тимчасові файли окремі
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(magic, count, crc, int(time.time())))
+        for block in blocks:
+            f.write(block)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    # rename надійний лише після fsync каталогу
+    dir_fd = os.open(os.path.dirname(path) or ".", os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+
+
+def _open_snapshot(path: str, magic: bytes):
+    # (mmap, count) або None, якщо файлу немає; пошкоджений файл - ValueError
+    if not os.path.exists(path) or os.path.getsize(path) < HEADER.size:
+        return None
+    with open(path, "rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    file_magic, count, crc, _ = HEADER.unpack_from(mapped, 0)
+    if file_magic != magic or zlib.crc32(memoryview(mapped)[HEADER.size:]) != crc:
+        mapped.close()
+        raise ValueError(f"Corrupted snapshot {path}")
+    return mapped, count
+
+
+def build_values_snapshot(container: ValuesDataContainer | CompactValuesContainer) -> tuple:
+    # Копія робиться в циклі подій (без await), запис у файл - уже в окремому потоці
+    tags, timestamps, values = container.snapshot()
+    return len(tags), [timestamps.tobytes(), values.tobytes(), SEPARATOR.join(tags).encode("utf-8")]
+
+
+def build_events_snapshot(container: EventDataContainer) -> tuple:
+    enums = array("q")
+    statuses = array("d")
+    counts = array("I")
+    tags = []
+    for tag, events in container.get_all_events().items():
+        tags.append(tag)
+        counts.append(len(events))
+        enums.extend(int(enum) for enum in events)
+        statuses.extend(events.values())
+    blocks = [enums.tobytes(), statuses.tobytes(), struct.pack("<I", len(tags)), counts.tobytes(),
+              SEPARATOR.join(tags).encode("utf-8")]
+    return len(enums), blocks
+
+
+def load_values_snapshot(path: str, container: ValuesDataContainer | CompactValuesContainer) -> int:
+    opened = _open_snapshot(path, MAGIC_VALUES)
+    if opened is None:
+        return 0
+    mapped, count = opened
+    with mapped:
+        view = memoryview(mapped)
+        offset = HEADER.size
+        timestamps = view[offset:offset + 8 * count]
+        values = view[offset + 8 * count:offset + 16 * count]
+        blob = bytes(view[offset + 16 * count:])
+        tags = blob.decode("utf-8").split(SEPARATOR) if count else []
+        container.load(tags, timestamps, values)
+        # memoryview треба звільнити до закриття mmap
+        del view, timestamps, values
+    return count
+
+
+def load_events_snapshot(path: str, container: EventDataContainer) -> int:
+    opened = _open_snapshot(path, MAGIC_EVENTS)
+    if opened is None:
+        return 0
+    mapped, entries = opened
+    with mapped:
+        offset = HEADER.size
+        enums = array("q")
+        enums.frombytes(mapped[offset:offset + 8 * entries])
+        offset += 8 * entries
+        statuses = array("d")
+        statuses.frombytes(mapped[offset:offset + 8 * entries])
+        offset += 8 * entries
+        tags_count, = struct.unpack_from("<I", mapped, offset)
+        offset += 4
+        counts = array("I")
+        counts.frombytes(mapped[offset:offset + 4 * tags_count])
+        offset += 4 * tags_count
+        tags = mapped[offset:].decode("utf-8").split(SEPARATOR) if tags_count else []
+    update: Dict[str, Dict[int, float]] = {}
+    position = 0
+    for tag, count in zip(tags, counts):
+        update[tag] = dict(zip(enums[position:position + count], statuses[position:position + count]))
+        position += count
+    container.update_event(update)
+    return len(update)
+
+
+async def seed_values_from_measures(container: ValuesDataContainer | CompactValuesContainer,
+                                    logged_tags: Dict[str, int]) -> int:
+    """
+    Запасний варіант, коли знімка немає: останній вимір кожного логованого тегу з measures.
+    MAX(measureTime) по valueId береться з індексу (valueId, measureTime).
+    """
+    if not logged_tags:
+        return 0
+    tag_by_id = {value_id: tag for tag, value_id in logged_tags.items()}
+    latest = (
+        select(Measures.valueId, func.max(Measures.measureTime).label("measureTime"))
+        .where(Measures.valueId.in_(list(tag_by_id)))
+        .group_by(Measures.valueId)
+        .subquery()
+    )
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            select(Measures.valueId, Measures.measureTime, Measures.measureValue)
+            .join(latest, and_(Measures.valueId == latest.c.valueId,
+                               Measures.measureTime == latest.c.measureTime))
+        )
+        rows = result.all()
+    container.update_columns(
+        [tag_by_id[r[0]] for r in rows], [r[1] for r in rows], [float(r[2]) for r in rows]
+    )
+    return len(rows)
+
+
+class StateSnapshotter:
+    """
+    Раз на interval секунд зберігає стан values/events у directory, при зупинці - ще раз.
+    load() викликається при старті до того, як підключаться клієнти.
+    """
+
+    def __init__(self, directory: str, values: ValuesDataContainer | CompactValuesContainer,
+                 events: EventDataContainer, interval: float = 10.0):
+        self.directory = directory
+        self.values = values
+        self.events = events
+        self.interval = interval
+        self.saves = 0
+        self.last_save_time = 0.0
+        self.last_error: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def load(self) -> Dict[str, int]:
+        loaded = {"values": 0, "events": 0}
+        for name, load, container in (("values", load_values_snapshot, self.values),
+                                      ("events", load_events_snapshot, self.events)):
+            path = os.path.join(self.directory, VALUES_FILE if name == "values" else EVENTS_FILE)
+            try:
+                loaded[name] = load(path, container)
+            except (ValueError, OSError) as e:
+                print(f"Error loading snapshot {path}: {e}")
+        return loaded
+
+    async def save(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        values_count, values_blocks = build_values_snapshot(self.values)
+        events_count, events_blocks = build_events_snapshot(self.events)
+        await asyncio.to_thread(_atomic_write, os.path.join(self.directory, VALUES_FILE),
+                                MAGIC_VALUES, values_count, values_blocks)
+        await asyncio.to_thread(_atomic_write, os.path.join(self.directory, EVENTS_FILE),
+                                MAGIC_EVENTS, events_count, events_blocks)
+        self.saves += 1
+        self.last_save_time = time.time()
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+        await self.save()
+
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.save()
+                self.last_error = None
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"State snapshot failed: {e}")
+
+    def get_stats(self) -> dict:
+        return {
+            "running": self.is_running,
+            "directory": self.directory,
+            "saves": self.saves,
+            "last_save_time": self.last_save_time,
+            "last_error": self.last_error
+        }
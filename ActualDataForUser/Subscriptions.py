@@ -0,0 +1,171 @@
+from typing import Any, Callable, Dict, Iterable, List, Set
+
+WILDCARD = "*"
+
+
+class _TrieNode:
+    __slots__ = ("children", "exact", "tail")
+
+    def __init__(self):
+        self.children: Dict[str, "_TrieNode"] = {}
+        # Клієнти, чий шаблон закінчується на цьому вузлі
+        self.exact: Set[Any] = set()
+        # Клієнти з шаблоном ".../*" - усе, що глибше цього вузла
+        self.tail: Set[Any] = set()
+
+    def is_empty(self) -> bool:
+        return not (self.children or self.exact or self.tail)
+
+
+def is_pattern(tag: str) -> bool:
+    return WILDCARD in tag
+
+
+def pattern_matches(pattern: str, tag: str, separator: str = "/") -> bool:
+    # "*" в кінці шаблону - будь-яка кількість (>= 1) сегментів, посередині - рівно один сегмент
+    pattern_parts = pattern.split(separator)
+    tag_parts = tag.split(separator)
+    for i, part in enumerate(pattern_parts):
+        if part == WILDCARD and i == len(pattern_parts) - 1:
+            return len(tag_parts) > i
+        if i >= len(tag_parts) or (part != WILDCARD and part != tag_parts[i]):
+            return False
+    return len(tag_parts) == len(pattern_parts)
+
+
+class SubscriptionIndex:
+    """
+    Інвертований індекс підписок: tag -> множина клієнтів.
+    Оновлення розсилається лише клієнтам, підписаним на змінені теги,
+    без перебору всіх підключень.
+
+    Крім точних тегів підтримуються шаблони по ієрархії node/device/value:
+    "plant1/line3/*" - усе під plant1/line3, "plant1/*/temp" - temp на будь-якій лінії.
+    Шаблони лежать у префіксному дереві, тож пошук підписників тегу коштує O(довжини тегу).
+    """
+    __slots__ = ("by_tag", "by_client", "trie", "separator")
+
+    def __init__(self, separator: str = "/"):
+        self.by_tag: Dict[str, Set[Any]] = {}
+        self.by_client: Dict[Any, Set[str]] = {}
+        self.trie = _TrieNode()
+        self.separator = separator
+
+    def set_tags(self, client, tags: Iterable[str]) -> None:
+        # Замінює підписку клієнта повністю
+        self.remove_client(client)
+        self.by_client[client] = set()
+        self.subscribe(client, tags)
+
+    def subscribe(self, client, tags: Iterable[str]) -> List[str]:
+        # Додає теги/шаблони до підписки; повертає ті, яких ще не було
+        client_tags = self.by_client.setdefault(client, set())
+        added = []
+        for tag in tags:
+            if tag in client_tags:
+                continue
+            client_tags.add(tag)
+            added.append(tag)
+            if is_pattern(tag):
+                self._trie_add(client, tag)
+            else:
+                self.by_tag.setdefault(tag, set()).add(client)
+        return added
+
+    def unsubscribe(self, client, tags: Iterable[str]) -> None:
+        client_tags = self.by_client.get(client)
+        if not client_tags:
+            return
+        for tag in tags:
+            if tag not in client_tags:
+                continue
+            client_tags.discard(tag)
+            if is_pattern(tag):
+                self._trie_remove(client, tag)
+                continue
+            clients = self.by_tag.get(tag)
+            if clients is None:
+                continue
+            clients.discard(client)
+            if not clients:
+                del self.by_tag[tag]
+
+    def remove_client(self, client) -> None:
+        self.unsubscribe(client, list(self.by_client.get(client, ())))
+        self.by_client.pop(client, None)
+
+    def tags_of(self, client) -> Set[str]:
+        return self.by_client.get(client, set())
+
+    def subscribers(self, tag: str) -> Set[Any]:
+        exact = self.by_tag.get(tag)
+        # Без шаблонів (ні гілок, ні "*" у корені) дерево можна не обходити
+        if not self.trie.children and not self.trie.tail:
+            return exact or set()
+        result = set(exact) if exact else set()
+        self._trie_match(self.trie, tag.split(self.separator), 0, result)
+        return result
+
+    def group_by_client(self, items: Iterable, tag_of: Callable[[Any], str]) -> Dict[Any, List]:
+        # client -> елементи оновлення, на теги яких він підписаний (у порядку оновлення)
+        result: Dict[Any, List] = {}
+        for item in items:
+            for client in self.subscribers(tag_of(item)):
+                result.setdefault(client, []).append(item)
+        return result
+
+    def matching(self, patterns: Iterable[str], tags: Iterable[str]) -> List[str]:
+        # Які з наявних тегів підпадають під точні теги або шаблони (для початкової відповіді)
+        exact = set()
+        wildcards = []
+        for pattern in patterns:
+            if is_pattern(pattern):
+                wildcards.append(pattern)
+            else:
+                exact.add(pattern)
+        return [
+            tag for tag in tags
+            if tag in exact or any(pattern_matches(p, tag, self.separator) for p in wildcards)
+        ]
+
+    def _trie_add(self, client, pattern: str) -> None:
+        parts = pattern.split(self.separator)
+        node = self.trie
+        for i, part in enumerate(parts):
+            if part == WILDCARD and i == len(parts) - 1:
+                node.tail.add(client)
+                return
+            node = node.children.setdefault(part, _TrieNode())
+        node.exact.add(client)
+
+    def _trie_remove(self, client, pattern: str) -> None:
+        parts = pattern.split(self.separator)
+        path = [self.trie]
+        node = self.trie
+        for i, part in enumerate(parts):
+            if part == WILDCARD and i == len(parts) - 1:
+                node.tail.discard(client)
+                break
+            node = node.children.get(part)
+            if node is None:
+                return
+            path.append(node)
+        else:
+            node.exact.discard(client)
+        # Прибираємо порожні вузли знизу вгору
+        for depth in range(len(path) - 1, 0, -1):
+            if not path[depth].is_empty():
+                break
+            del path[depth - 1].children[parts[depth - 1]]
+
+    def _trie_match(self, node: _TrieNode, parts: List[str], i: int, result: Set[Any]) -> None:
+        if i == len(parts):
+            result.update(node.exact)
+            return
+        result.update(node.tail)
+        child = node.children.get(parts[i])
+        if child is not None:
+            self._trie_match(child, parts, i + 1, result)
+        child = node.children.get(WILDCARD)
+        if child is not None:
+            self._trie_match(child, parts, i + 1, result)
@@ -0,0 +1,114 @@
+from array import array
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from ActualDataForUser.ActualValuesData import is_valid_value
+from ActualDataForUser.Subscriptions import pattern_matches
+
+
+class _Ring:
+    __slots__ = ("timestamps", "values", "head", "count")
+
+    def __init__(self, capacity: int):
+        self.timestamps = array("q", bytes(8 * capacity))
+        self.values = array("d", bytes(8 * capacity))
+        # head - куди піде наступний семпл
+        self.head = 0
+        self.count = 0
+
+    def last_timestamp(self) -> Optional[int]:
+        return self.timestamps[self.head - 1] if self.count else None
+
+    def append(self, timestamp: int, value: float) -> None:
+        self.timestamps[self.head] = timestamp
+        self.values[self.head] = value
+        self.head = (self.head + 1) % len(self.timestamps)
+        if self.count < len(self.timestamps):
+            self.count += 1
+
+    def ordered(self) -> Tuple[array, array]:
+        # Від найстарішого до найновішого
+        if self.count < len(self.timestamps):
+            return self.timestamps[:self.count], self.values[:self.count]
+        return (self.timestamps[self.head:] + self.timestamps[:self.head],
+                self.values[self.head:] + self.values[:self.head])
+
+
+class ValuesHistory:
+    """
+    Недавня історія кожного тегу в пам'яті - для трендів HMI без запиту в MySQL.
+    На тег - кільцевий буфер на capacity семплів у заздалегідь виділених array('q') / array('d');
+    якщо задано window, віддаються лише семпли не старші за window від останнього
+    (у тих самих одиницях, що й timestamp).
+
+    capacity <= 0 - історію вимкнено. tags - точні теги або шаблони ("plant1/line3/*"),
+    для яких вести історію (None - для всіх): буфер виділяється лише під них.
+
+    Буфер тегу впорядкований за часом (на цьому тримається bisect у get): семпл, старший
+    за останній записаний (запізнілий продюсер, шина воркерів), відкидається і рахується в out_of_order.
+    """
+    __slots__ = ("capacity", "window", "patterns", "separator", "rings", "skipped", "out_of_order")
+
+    def __init__(self, capacity: int = 0, window: Optional[int] = None,
+                 tags: Optional[Iterable[str]] = None, separator: str = "/"):
+        self.capacity = capacity
+        self.window = window
+        self.patterns = list(tags) if tags is not None else None
+        self.separator = separator
+        self.rings: Dict[str, _Ring] = {}
+        # Теги, що не підпадають під patterns, - щоб не перевіряти шаблони на кожному семплі
+        self.skipped: Set[str] = set()
+        self.out_of_order = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.capacity > 0
+
+    def _tracked(self, tag: str) -> bool:
+        if self.patterns is None:
+            return True
+        return any(pattern == tag or pattern_matches(pattern, tag, self.separator) for pattern in self.patterns)
+
+    def record(self, values: Iterable) -> None:
+        if self.capacity <= 0:
+            return
+        rings, skipped = self.rings, self.skipped
+        for item in values:
+            # Нечислові значення в array('d') не лягають - їх в історії просто немає
+            if not is_valid_value(item):
+                continue
+            ring = rings.get(item.tag)
+            if ring is None:
+                if item.tag in skipped:
+                    continue
+                if not self._tracked(item.tag):
+                    skipped.add(item.tag)
+                    continue
+                ring = rings[item.tag] = _Ring(self.capacity)
+            timestamp = int(item.timestamp)
+            last = ring.last_timestamp()
+            if last is not None and timestamp < last:
+                self.out_of_order += 1
+                continue
+            ring.append(timestamp, item.value)
+
+    def get(self, tag: str, start: Optional[int] = None, limit: Optional[int] = None) -> Dict[str, List]:
+        # {"t": [...], "value": [...]} за зростанням часу; limit - останні limit семплів (limit >= 1)
+        ring = self.rings.get(tag)
+        if ring is None or not ring.count or (limit is not None and limit < 1):
+            return {"t": [], "value": []}
+        timestamps, values = ring.ordered()
+        if self.window is not None:
+            window_start = timestamps[-1] - self.window
+            start = window_start if start is None else max(start, window_start)
+        first = bisect_left(timestamps, start) if start is not None else 0
+        if limit is not None:
+            first = max(first, len(timestamps) - limit)
+        return {"t": timestamps[first:].tolist(), "value": values[first:].tolist()}
+
+    def get_many(self, tags: Iterable[str], start: Optional[int] = None,
+                 limit: Optional[int] = None) -> Dict[str, Dict[str, List]]:
+        return {tag: self.get(tag, start, limit) for tag in tags if tag in self.rings}
+
+    def get_tags(self) -> List[str]:
+        return list(self.rings)
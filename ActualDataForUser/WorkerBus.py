@@ -0,0 +1,209 @@
+import asyncio
+import json
+import os
+import socket
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from ActualDataForUser.FastJson import dumps
+
+# Unix datagram обмежений розміром буфера сокета, тому великі повідомлення ріжуться на частини
+MAX_DATAGRAM = 60 * 1024
+# Запит знімка - теж датаграма і може загубитись: повтор, поки не прийде відповідь
+SYNC_RETRY_INTERVAL = 1.0
+SYNC_ATTEMPTS = 10
+
+
+class _BusProtocol(asyncio.DatagramProtocol):
+    def __init__(self, bus: "WorkerBus"):
+        self.bus = bus
+
+    def datagram_received(self, data: bytes, addr) -> None:
+        self.bus._on_datagram(data)
+
+    def error_received(self, exc: Exception) -> None:
+        self.bus.stats["send_errors"] += 1
+
+
+class WorkerBus:
+    """
+    Локальний pub/sub між процесами uvicorn (--workers N) через Unix datagram сокети.
+    Кожен воркер слухає свій сокет у bus_dir і розсилає оновлення всім іншим,
+    тож ValuesDataContainer / EventDataContainer у кожному процесі - повна репліка,
+    а клієнти будь-якого воркера бачать оновлення продюсерів з усіх воркерів.
+    Новий воркер при старті просить у сусіда знімок стану і повторює запит (по черзі
+    до різних сусідів), доки не прийде перша частина знімка або маркер його кінця.
+    Частини знімка приймаються лише від сусіда, що відповів першим.
+    """
+
+    def __init__(self, bus_dir: str, peers_refresh_interval: float = 2.0):
+        self.bus_dir = bus_dir
+        self.path = os.path.join(bus_dir, f"{os.getpid()}.sock")
+        self.peers_refresh_interval = peers_refresh_interval
+        self.peers: List[str] = []
+        self.handlers: Dict[str, Callable[[Any], None]] = {}
+        self.snapshot_providers: Dict[str, Callable[[], List[Any]]] = {}
+        self.stats = {"published": 0, "received": 0, "send_errors": 0, "bad_datagrams": 0,
+                      "handler_errors": 0, "sync_requests": 0}
+        self.synced_from: Optional[str] = None
+        self._transport: Optional[asyncio.DatagramTransport] = None
+        self._peers_task: Optional[asyncio.Task] = None
+        self._sync_task: Optional[asyncio.Task] = None
+        self._peers_refreshed = 0.0
+
+    @property
+    def is_running(self) -> bool:
+        return self._transport is not None
+
+    def subscribe(self, kind: str, handler: Callable[[Any], None],
+                  snapshot: Optional[Callable[[], List[Any]]] = None) -> None:
+        # handler застосовує повідомлення від інших воркерів; snapshot - частини повного стану для новачків
+        self.handlers[kind] = handler
+        if snapshot is not None:
+            self.snapshot_providers[kind] = snapshot
+
+    async def start(self) -> None:
+        os.makedirs(self.bus_dir, exist_ok=True)
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 1024 * 1024)
+        sock.bind(self.path)
+        sock.setblocking(False)
+        loop = asyncio.get_running_loop()
+        self._transport, _ = await loop.create_datagram_endpoint(lambda: _BusProtocol(self), sock=sock)
+        self._refresh_peers()
+        self._peers_task = asyncio.create_task(self._peers_loop())
+        # Знімок стану просимо в одного живого сусіда
+        if self.peers:
+            self._sync_task = asyncio.create_task(self._sync_loop())
+
+    async def stop(self) -> None:
+        if self._peers_task:
+            self._peers_task.cancel()
+        if self._sync_task:
+            self._sync_task.cancel()
+        if self._transport:
+            # Даємо відправитися датаграмам, що чекають у буфері транспорту
+            for _ in range(100):
+                if not self._transport.get_write_buffer_size():
+                    break
+                await asyncio.sleep(0.01)
+            self._transport.close()
+            self._transport = None
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def publish(self, kind: str, payload: Any) -> None:
+        if not self._transport:
+            return
+        if time.monotonic() - self._peers_refreshed > self.peers_refresh_interval:
+            self._refresh_peers()
+        if not self.peers:
+            return
+        data = dumps({"k": kind, "d": payload}).encode("utf-8")
+        if len(data) > MAX_DATAGRAM and isinstance(payload, (list, dict)) and len(payload) > 1:
+            # Ділимо список (або словник по тегах) навпіл, поки частини не влізуть у датаграму
+            items = list(payload.items()) if isinstance(payload, dict) else payload
+            middle = len(items) // 2
+            for part in (items[:middle], items[middle:]):
+                self.publish(kind, dict(part) if isinstance(payload, dict) else part)
+            return
+        for peer in self.peers:
+            self._send_raw(peer, data)
+        self.stats["published"] += 1
+
+    def _send(self, peer: str, message: dict) -> None:
+        self._send_raw(peer, dumps(message).encode("utf-8"))
+
+    def _send_raw(self, peer: str, data: bytes) -> None:
+        try:
+            self._transport.sendto(data, peer)
+        except OSError:
+            self.stats["send_errors"] += 1
+
+    def _on_datagram(self, data: bytes) -> None:
+        # Виклик з колбека протоколу: обрізана чи чужа датаграма не повинна падати в event loop
+        try:
+            message = json.loads(data)
+            kind = message["k"]
+            if kind == "sync":
+                self._send_snapshot(message["from"])
+                return
+            if "s" in message:
+                # Частина знімка (або "synced" - його кінець) у відповідь на наш запит sync
+                if self.synced_from is None:
+                    self.synced_from = message["s"]
+                elif message["s"] != self.synced_from:
+                    return
+                if kind == "synced":
+                    return
+            payload = message["d"]
+        except (ValueError, KeyError, TypeError):
+            self.stats["bad_datagrams"] += 1
+            return
+        handler = self.handlers.get(kind)
+        if handler:
+            self.stats["received"] += 1
+            try:
+                handler(payload)
+            except Exception as e:
+                self.stats["handler_errors"] += 1
+                print(f"Worker bus handler for {kind} failed: {e}")
+
+    def _send_snapshot(self, peer: str) -> None:
+        for kind, provider in self.snapshot_providers.items():
+            for chunk in provider():
+                self._send(peer, {"k": kind, "d": chunk, "s": self.path})
+        # Маркер кінця: і порожній стан підтверджує, що запит дійшов
+        self._send(peer, {"k": "synced", "s": self.path})
+
+    async def _sync_loop(self) -> None:
+        for attempt in range(SYNC_ATTEMPTS):
+            if not self.peers:
+                return
+            self.stats["sync_requests"] += 1
+            self._send(self.peers[attempt % len(self.peers)], {"k": "sync", "from": self.path})
+            await asyncio.sleep(SYNC_RETRY_INTERVAL)
+            if self.synced_from is not None:
+                return
+        print(f"Worker bus: no state snapshot after {SYNC_ATTEMPTS} requests")
+
+    def _refresh_peers(self) -> None:
+        self._peers_refreshed = time.monotonic()
+        peers = []
+        for name in os.listdir(self.bus_dir):
+            if not name.endswith(".sock"):
+                continue
+            path = os.path.join(self.bus_dir, name)
+            if path == self.path:
+                continue
+            pid = name[:-5]
+            if pid.isdigit() and not _pid_alive(int(pid)):
+                # Сокет лишився від воркера, що впав
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                continue
+            peers.append(path)
+        self.peers = peers
+
+    async def _peers_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.peers_refresh_interval)
+            self._refresh_peers()
+
+    def get_stats(self) -> dict:
+        return {"running": self.is_running, "path": self.path, "peers": len(self.peers),
+                "synced": self.synced_from is not None, **self.stats}
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
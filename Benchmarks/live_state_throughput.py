@@ -0,0 +1,117 @@
+#live_state_throughput.py
+# Пропускна здатність оновлень живого стану: один процес (liveStateBackend = "local")
+# проти реплікації між воркерами через WorkerBus (liveStateBackend = "worker_bus").
+# БД не потрібна.
+#
+#   python -m Benchmarks.live_state_throughput --workers 4 --batches 2000 --batch-size 50
+import argparse
+import asyncio
+import multiprocessing
+import os
+import tempfile
+import time
+
+from ActualDataForUser.ActualValuesData import ValuesDataContainer, HashedValue
+from ActualDataForUser.WorkerBus import WorkerBus
+
+TAGS_COUNT = 5000
+
+
+def make_batches(batches: int, batch_size: int) -> list[list[HashedValue]]:
+    return [
+        [HashedValue(f"node{(b * batch_size + i) % 50}/dev/value{(b * batch_size + i) % TAGS_COUNT}",
+                     1_700_000_000 + b, float(i)) for i in range(batch_size)]
+        for b in range(batches)
+    ]
+
+
+def run_local(batches: list[list[HashedValue]]) -> float:
+    vault = ValuesDataContainer()
+    t0 = time.perf_counter()
+    for values in batches:
+        vault.update_values(values)
+    return time.perf_counter() - t0
+
+
+def consumer(bus_dir: str, expected: int, ready, results) -> None:
+    async def main():
+        vault = ValuesDataContainer()
+        bus = WorkerBus(bus_dir)
+        received = 0
+        done = asyncio.Event()
+        started = None
+
+        def apply(rows):
+            nonlocal received, started
+            if started is None:
+                started = time.perf_counter()
+            vault.update_values([HashedValue(tag, timestamp, value) for tag, timestamp, value in rows])
+            received += len(rows)
+            if received >= expected:
+                done.set()
+
+        bus.subscribe("values", apply)
+        await bus.start()
+        ready.put(os.getpid())
+        await done.wait()
+        results.put(time.perf_counter() - started)
+        await bus.stop()
+
+    asyncio.run(main())
+
+
+def run_worker_bus(batches: list[list[HashedValue]], workers: int) -> tuple[float, list[float]]:
+    expected = sum(len(values) for values in batches)
+    with tempfile.TemporaryDirectory() as bus_dir:
+        ready = multiprocessing.Queue()
+        results = multiprocessing.Queue()
+        processes = [
+            multiprocessing.Process(target=consumer, args=(bus_dir, expected, ready, results))
+            for _ in range(workers - 1)
+        ]
+        for process in processes:
+            process.start()
+        for _ in processes:
+            ready.get()
+
+        async def produce() -> float:
+            vault = ValuesDataContainer()
+            bus = WorkerBus(bus_dir)
+            await bus.start()
+            t0 = time.perf_counter()
+            for values in batches:
+                vault.update_values(values)
+                bus.publish("values", [[v.tag, v.timestamp, v.value] for v in values])
+                # Даємо циклу подій виштовхнути буферизовані датаграми
+                await asyncio.sleep(0)
+            elapsed = time.perf_counter() - t0
+            await bus.stop()
+            return elapsed
+
+        produced = asyncio.run(produce())
+        consumed = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+    return produced, consumed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Live state throughput: local vs worker_bus")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--batches", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=50)
+    args = parser.parse_args()
+
+    batches = make_batches(args.batches, args.batch_size)
+    total = args.batches * args.batch_size
+
+    local = run_local(batches)
+    print(f"local:      {total / local:12.0f} values/s (1 process)")
+
+    produced, consumed = run_worker_bus(batches, args.workers)
+    print(f"worker_bus: {total / produced:12.0f} values/s published, "
+          f"{total / max(consumed):12.0f} values/s applied on each of {args.workers - 1} peers")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+#measures_range_query.py
+# Латентність діапазонного запиту по measures залежно від розміру таблиці.
+# Працює на окремій таблиці measures_bench у базі з settings.connectToDB, робочі дані не чіпає.
+#
+#   python -m Benchmarks.measures_range_query --sizes 1000000,10000000,100000000
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from sqlalchemy import text
+
+from DataBase.database import engine
+
+VALUES_COUNT = 200
+SAMPLE_PERIOD = 1  # секунд між вимірами одного value
+START_TIME = 1_700_000_000
+
+CREATE_TABLE = """
+CREATE TABLE measures_bench (
+    id BIGINT NOT NULL AUTO_INCREMENT,
+    valueId INT NOT NULL,
+    measureValue DOUBLE NOT NULL,
+    measureTime BIGINT NOT NULL,
+    PRIMARY KEY (id),
+    INDEX ix_measures_bench_value_time (valueId, measureTime)
+)
+"""
+
+RANGE_QUERY = """
+SELECT measureTime, measureValue FROM measures_bench {hint}
+WHERE valueId = :value_id AND measureTime BETWEEN :start AND :end
+ORDER BY measureTime
+"""
+
+
+async def fill_to(conn, target: int, current: int) -> int:
+    # Кожен рядок n-ї пачки: value = n % VALUES_COUNT, час росте, поки не дійдемо до target
+    batch = 10000
+    while current < target:
+        rows = min(batch, target - current)
+        values = ",".join(
+            f"({(current + i) % VALUES_COUNT},{random.random() * 100},"
+            f"{START_TIME + ((current + i) // VALUES_COUNT) * SAMPLE_PERIOD})"
+            for i in range(rows)
+        )
+        await conn.execute(text(f"INSERT INTO measures_bench (valueId, measureValue, measureTime) VALUES {values}"))
+        current += rows
+    return current
+
+
+async def measure(conn, rows: int, hint: str, queries: int, window: int) -> list[float]:
+    span = max(rows // VALUES_COUNT * SAMPLE_PERIOD - window, 1)
+    latencies = []
+    for _ in range(queries):
+        start = START_TIME + random.randrange(span)
+        t0 = time.perf_counter()
+        result = await conn.execute(text(RANGE_QUERY.format(hint=hint)), {
+            "value_id": random.randrange(VALUES_COUNT), "start": start, "end": start + window
+        })
+        result.all()
+        latencies.append((time.perf_counter() - t0) * 1000)
+    return latencies
+
+
+async def main(sizes: list[int], queries: int, window: int, keep: bool) -> None:
+    async with engine.connect() as conn:
+        await conn.execute(text("DROP TABLE IF EXISTS measures_bench"))
+        await conn.execute(text(CREATE_TABLE))
+        await conn.commit()
+
+        print(f"{'rows':>12} | {'index p50 ms':>12} | {'index p95 ms':>12} | {'no index p50 ms':>15}")
+        current = 0
+        for size in sizes:
+            current = await fill_to(conn, size, current)
+            await conn.commit()
+            await conn.execute(text("ANALYZE TABLE measures_bench"))
+
+            with_index = sorted(await measure(conn, current, "", queries, window))
+            # Без індексу повний скан - на 100M це хвилини, тому лише кілька запитів
+            without_index = await measure(
+                conn, current, "IGNORE INDEX (ix_measures_bench_value_time)", max(queries // 20, 1), window
+            )
+            print(f"{current:>12} | {statistics.median(with_index):>12.2f} | "
+                  f"{with_index[int(len(with_index) * 0.95) - 1]:>12.2f} | "
+                  f"{statistics.median(without_index):>15.2f}")
+
+        if not keep:
+            await conn.execute(text("DROP TABLE measures_bench"))
+            await conn.commit()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Range query latency on measures vs table size")
+    parser.add_argument("--sizes", default="1000000,10000000,100000000")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--window", type=int, default=3600, help="Range width in seconds")
+    parser.add_argument("--keep", action="store_true", help="Do not drop measures_bench afterwards")
+    args = parser.parse_args()
+    asyncio.run(main([int(s) for s in args.sizes.split(",")], args.queries, args.window, args.keep))
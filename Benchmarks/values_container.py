@@ -0,0 +1,91 @@
+#values_container.py
+# ValuesDataContainer (dict з HashedValue на тег) проти CompactValuesContainer (масиви за слотами):
+# пам'ять, оновлення пачками, get_all_values і snapshot. БД не потрібна.
+#
+#   python -m Benchmarks.values_container --tags 100000 --rounds 20
+import argparse
+import gc
+import time
+import tracemalloc
+
+from ActualDataForUser.ActualValuesData import ValuesDataContainer, CompactValuesContainer, HashedValue
+
+BATCH_SIZE = 500
+
+
+def make_round(tags: list[str], round_no: int) -> list[list[HashedValue]]:
+    # Як після json.loads: у кожному оновленні тег - новий рядок з тим самим вмістом
+    values = [HashedValue(tag[:-1] + tag[-1:], 1_700_000_000 + round_no, float(i + round_no))
+              for i, tag in enumerate(tags)]
+    return [values[i:i + BATCH_SIZE] for i in range(0, len(values), BATCH_SIZE)]
+
+
+def measure_memory(container_cls, tags: list[str]) -> int:
+    # Пам'ять, яку тримає сам контейнер після двох раундів оновлень (пачки вже звільнені)
+    gc.collect()
+    tracemalloc.start()
+    container = container_cls()
+    for round_no in range(2):
+        for batch in make_round(tags, round_no):
+            container.update_values(batch)
+    del batch
+    gc.collect()
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return memory
+
+
+def run(container_cls, tags: list[str], rounds: int) -> dict:
+    gc.collect()
+    container = container_cls()
+    update_time = 0.0
+    for round_no in range(rounds):
+        batches = make_round(tags, round_no)
+        t0 = time.perf_counter()
+        for batch in batches:
+            container.update_values(batch)
+        update_time += time.perf_counter() - t0
+    del batches, batch
+
+    t0 = time.perf_counter()
+    for _ in range(rounds):
+        container.get_all_values()
+    get_all_time = (time.perf_counter() - t0) / rounds
+
+    snapshot_time = None
+    if hasattr(container, "snapshot"):
+        t0 = time.perf_counter()
+        for _ in range(rounds):
+            container.snapshot()
+        snapshot_time = (time.perf_counter() - t0) / rounds
+
+    gc_time = time.perf_counter()
+    gc.collect()
+    gc_time = time.perf_counter() - gc_time
+
+    return {
+        "memory_mb": measure_memory(container_cls, tags) / 2 ** 20,
+        "updates_per_s": len(tags) * rounds / update_time,
+        "get_all_ms": get_all_time * 1000,
+        "snapshot_ms": snapshot_time * 1000 if snapshot_time is not None else None,
+        "gc_ms": gc_time * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ValuesDataContainer vs CompactValuesContainer")
+    parser.add_argument("--tags", type=int, default=100_000)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    tags = [f"node{i % 100}/device{i % 1000}/value{i}" for i in range(args.tags)]
+    for container_cls in (ValuesDataContainer, CompactValuesContainer):
+        stats = run(container_cls, tags, args.rounds)
+        snapshot = f"{stats['snapshot_ms']:8.3f}" if stats["snapshot_ms"] is not None else "       -"
+        print(f"{container_cls.__name__:24} memory {stats['memory_mb']:7.1f} MB  "
+              f"update {stats['updates_per_s']:11.0f}/s  get_all {stats['get_all_ms']:8.1f} ms  "
+              f"snapshot {snapshot} ms  gc {stats['gc_ms']:6.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
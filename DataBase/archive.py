@@ -0,0 +1,139 @@
+#archive.py
+# Архів вимірів, що вийшли за retention: стиснуті колонкові файли на локальному диску.
+# Один файл на value і добу: <archive_dir>/<valueId>/<YYYYMMDD>.mca
+# Файл - послідовність сегментів (кожен запуск архівації дописує новий сегмент):
+#   MAGIC | count:uint32 | len_ids:uint32 | len_times:uint32 | len_values:uint32 | zlib(ids) | zlib(times) | zlib(values)
+# ids і times зберігаються дельтами (int64), values - як float64.
+import os
+import struct
+import zlib
+from array import array
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+MAGIC = b"MCA1"
+HEADER = struct.Struct("<4sIIII")
+DAY = 86400
+
+
+def _delta_encode(items: List[int]) -> array:
+    encoded = array("q", items)
+    for i in range(len(encoded) - 1, 0, -1):
+        encoded[i] -= encoded[i - 1]
+    return encoded
+
+
+def _delta_decode(encoded: array) -> array:
+    for i in range(1, len(encoded)):
+        encoded[i] += encoded[i - 1]
+    return encoded
+
+
+def day_file(archive_dir: str, value_id: int, day_start: int) -> str:
+    day = datetime.fromtimestamp(day_start, timezone.utc).strftime("%Y%m%d")
+    return os.path.join(archive_dir, str(value_id), f"{day}.mca")
+
+
+def write_segment(path: str, rows: List[Tuple[int, int, float]]) -> None:
+    # rows: (id, measureTime, measureValue), відсортовані за (measureTime, id)
+    ids = _delta_encode([r[0] for r in rows])
+    times = _delta_encode([r[1] for r in rows])
+    values = array("d", [float(r[2]) for r in rows])
+    blocks = [zlib.compress(col.tobytes(), 6) for col in (ids, times, values)]
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "ab") as f:
+        f.write(HEADER.pack(MAGIC, len(rows), *(len(b) for b in blocks)))
+        for block in blocks:
+            f.write(block)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def read_file(path: str) -> List[Tuple[int, int, float]]:
+    rows = []
+    with open(path, "rb") as f:
+        data = f.read()
+    offset = 0
+    while offset + HEADER.size <= len(data):
+        magic, count, len_ids, len_times, len_values = HEADER.unpack_from(data, offset)
+        if magic != MAGIC:
+            raise ValueError(f"Corrupted archive segment in {path} at {offset}")
+        offset += HEADER.size
+        columns = []
+        for length, typecode in ((len_ids, "q"), (len_times, "q"), (len_values, "d")):
+            col = array(typecode)
+            col.frombytes(zlib.decompress(data[offset:offset + length]))
+            columns.append(col)
+            offset += length
+        ids = _delta_decode(columns[0])
+        times = _delta_decode(columns[1])
+        rows.extend(zip(ids, times, columns[2]))
+    return rows
+
+
+def archive_rows(archive_dir: str, rows: Iterable[Tuple[int, int, int, float]]) -> int:
+    """
+    Розкладає рядки (id, valueId, measureTime, measureValue) по денних файлах і дописує їх.
+    """
+    grouped: Dict[str, List[Tuple[int, int, float]]] = {}
+    for measure_id, value_id, measure_time, measure_value in rows:
+        path = day_file(archive_dir, value_id, measure_time - measure_time % DAY)
+        grouped.setdefault(path, []).append((measure_id, measure_time, measure_value))
+
+    written = 0
+    for path, day_rows in grouped.items():
+        day_rows.sort(key=lambda r: (r[1], r[0]))
+        write_segment(path, day_rows)
+        written += len(day_rows)
+    return written
+
+
+def iter_archive_days(archive_dir: Optional[str], value_id: int, start_time: Optional[int] = None,
+                      end_time: Optional[int] = None) -> Iterator[List[Tuple[int, int, float]]]:
+    """
+    Архівні рядки (id, measureTime, measureValue) value_id у проміжку - по одному денному файлу за раз,
+    кожна частина відсортована за (measureTime, id), дні йдуть за зростанням.
+    """
+    if not archive_dir:
+        return
+    value_dir = os.path.join(archive_dir, str(value_id))
+    if not os.path.isdir(value_dir):
+        return
+
+    for name in sorted(os.listdir(value_dir)):
+        if not name.endswith(".mca"):
+            continue
+        day_start = int(datetime.strptime(name[:-4], "%Y%m%d").replace(tzinfo=timezone.utc).timestamp())
+        if start_time is not None and day_start + DAY <= start_time:
+            continue
+        if end_time is not None and day_start > end_time:
+            break
+        # Повторна архівація після збою між записом файлу і DELETE дає дублікати - відсіюємо за id.
+        # День файлу визначається measureTime, тож той самий id не може опинитися в іншому файлі
+        rows = {}
+        for row in read_file(os.path.join(value_dir, name)):
+            if (start_time is None or row[1] >= start_time) and (end_time is None or row[1] <= end_time):
+                rows[row[0]] = row
+        if rows:
+            yield sorted(rows.values(), key=lambda r: (r[1], r[0]))
+
+
+def read_archive(archive_dir: Optional[str], value_id: int, start_time: Optional[int] = None,
+                 end_time: Optional[int] = None, after: Optional[Tuple[int, int]] = None,
+                 limit: Optional[int] = None) -> List[Tuple[int, int, float]]:
+    """
+    Архівні рядки (id, measureTime, measureValue) value_id у проміжку, відсортовані за (measureTime, id).
+    after = (measureTime, id) - лише рядки після цієї позиції; limit - не більше стількох рядків.
+    Файли читаються по одному і лише до набору limit.
+    """
+    if after is not None:
+        start_time = after[0] if start_time is None else max(start_time, after[0])
+    rows: List[Tuple[int, int, float]] = []
+    for day_rows in iter_archive_days(archive_dir, value_id, start_time, end_time):
+        if after is not None:
+            day_rows = [r for r in day_rows if (r[1], r[0]) > after]
+        rows.extend(day_rows)
+        if limit is not None and len(rows) >= limit:
+            return rows[:limit]
+    return rows
@@ -0,0 +1,144 @@
+#migrations.py
+# Прості міграції схеми без alembic: кожна міграція виконується один раз,
+# застосовані записуються в таблицю schema_migrations.
+from datetime import datetime, timezone
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from DataBase.database import Base
+
+
+async def index_exists(conn: AsyncConnection, table: str, index: str) -> bool:
+    result = await conn.execute(text(
+        "SELECT COUNT(*) FROM information_schema.statistics "
+        "WHERE table_schema = DATABASE() AND table_name = :table AND index_name = :index"
+    ), {"table": table, "index": index})
+    return result.scalar() > 0
+
+
+async def create_missing_tables(conn: AsyncConnection) -> None:
+    await conn.run_sync(Base.metadata.create_all)
+
+
+async def add_measures_value_time_index(conn: AsyncConnection) -> None:
+    # Усі запити по measures фільтрують valueId + діапазон measureTime
+    if not await index_exists(conn, "measures", "ix_measures_value_time"):
+        await conn.execute(text("CREATE INDEX ix_measures_value_time ON measures (valueId, measureTime)"))
+
+
+MIGRATIONS = [
+    ("0001_create_missing_tables", create_missing_tables),
+    ("0002_measures_value_time_index", add_measures_value_time_index),
+    # rollup_coverage; до backfill_rollups запити агрегатів ідуть по сирих measures
+    ("0003_rollup_coverage", create_missing_tables),
+]
+
+
+async def migrate(conn: AsyncConnection) -> list[str]:
+    await conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        "name VARCHAR(255) PRIMARY KEY, applied_at DATETIME NOT NULL)"
+    ))
+    result = await conn.execute(text("SELECT name FROM schema_migrations"))
+    applied = set(result.scalars().all())
+
+    done = []
+    for name, migration in MIGRATIONS:
+        if name in applied:
+            continue
+        await migration(conn)
+        await conn.execute(
+            text("INSERT INTO schema_migrations (name, applied_at) VALUES (:name, :applied_at)"),
+            {"name": name, "applied_at": datetime.now(timezone.utc).replace(tzinfo=None)}
+        )
+        done.append(name)
+    return done
+
+
+# ---- Опційне розбиття measures на місячні партиції по measureTime ----
+# InnoDB вимагає, щоб ключ партиціювання входив у кожен унікальний ключ, і не підтримує
+# зовнішні ключі на партиційованих таблицях. Тому PK стає (id, measureTime), а FK на
+# value_items видаляється (каскадне видалення вимірів треба робити вручну або retention-задачею).
+
+def month_starts(first: datetime, count: int) -> list[datetime]:
+    starts = []
+    year, month = first.year, first.month
+    for _ in range(count):
+        starts.append(datetime(year, month, 1, tzinfo=timezone.utc))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return starts
+
+
+def partition_name(start: datetime) -> str:
+    return f"p{start.year:04d}{start.month:02d}"
+
+
+def partition_clause(start: datetime) -> str:
+    # Партиція pYYYYMM містить рядки, старші за початок наступного місяця
+    next_month = month_starts(start, 2)[1]
+    return f"PARTITION {partition_name(start)} VALUES LESS THAN ({int(next_month.timestamp())})"
+
+
+async def foreign_keys(conn: AsyncConnection, table: str) -> list[str]:
+    result = await conn.execute(text(
+        "SELECT constraint_name FROM information_schema.table_constraints "
+        "WHERE table_schema = DATABASE() AND table_name = :table AND constraint_type = 'FOREIGN KEY'"
+    ), {"table": table})
+    return list(result.scalars().all())
+
+
+async def is_partitioned(conn: AsyncConnection, table: str) -> bool:
+    result = await conn.execute(text(
+        "SELECT COUNT(*) FROM information_schema.partitions "
+        "WHERE table_schema = DATABASE() AND table_name = :table AND partition_name IS NOT NULL"
+    ), {"table": table})
+    return result.scalar() > 0
+
+
+async def partition_measures(conn: AsyncConnection, months_ahead: int = 3) -> None:
+    """
+    Переводить measures на RANGE-партиції по місяцях: від найстарішого виміру
+    до months_ahead місяців наперед, плюс pmax для всього, що далі.
+    """
+    if await is_partitioned(conn, "measures"):
+        return
+
+    result = await conn.execute(text("SELECT MIN(measureTime) FROM measures"))
+    oldest = result.scalar()
+    now = datetime.now(timezone.utc)
+    first = datetime.fromtimestamp(oldest, timezone.utc) if oldest is not None else now
+    months = (now.year - first.year) * 12 + now.month - first.month + months_ahead + 1
+
+    for fk in await foreign_keys(conn, "measures"):
+        await conn.execute(text(f"ALTER TABLE measures DROP FOREIGN KEY {fk}"))
+    await conn.execute(text("ALTER TABLE measures DROP PRIMARY KEY, ADD PRIMARY KEY (id, measureTime)"))
+
+    partitions = [partition_clause(start) for start in month_starts(first, months)]
+    partitions.append("PARTITION pmax VALUES LESS THAN MAXVALUE")
+    await conn.execute(text(
+        f"ALTER TABLE measures PARTITION BY RANGE (measureTime) ({', '.join(partitions)})"
+    ))
+
+
+async def add_future_partitions(conn: AsyncConnection, months_ahead: int = 3) -> list[str]:
+    # Відрізає від pmax партиції на наступні місяці; запускати періодично (наприклад, cron раз на місяць)
+    if not await is_partitioned(conn, "measures"):
+        return []
+    result = await conn.execute(text(
+        "SELECT partition_name FROM information_schema.partitions "
+        "WHERE table_schema = DATABASE() AND table_name = 'measures' AND partition_name IS NOT NULL"
+    ))
+    existing = set(result.scalars().all())
+
+    added = []
+    for start in month_starts(datetime.now(timezone.utc), months_ahead + 1):
+        name = partition_name(start)
+        if name in existing:
+            continue
+        await conn.execute(text(
+            f"ALTER TABLE measures REORGANIZE PARTITION pmax INTO "
+            f"({partition_clause(start)}, PARTITION pmax VALUES LESS THAN MAXVALUE)"
+        ))
+        added.append(name)
+    return added
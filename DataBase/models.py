@@ -56,8 +56,51 @@ class QmlDecodingAddons(Base):
 
 class Measures(Base):
     __tablename__ = "measures"
+    __table_args__ = (
+        # Під усі діапазонні запити: WHERE valueId = ? AND measureTime BETWEEN ? AND ?
+        Index("ix_measures_value_time", "valueId", "measureTime"),
+    )
 
     id: Mapped[int] = mapped_column(BIGINT, primary_key=True, autoincrement=True, nullable=False)
     valueId: Mapped[int] = mapped_column(Integer, ForeignKey("value_items.id", ondelete="CASCADE", onupdate="CASCADE"), nullable=False)
     measureValue: Mapped[float] = mapped_column(DOUBLE, nullable=False)
-    measureTime: Mapped[int] = mapped_column(BIGINT, nullable=False)
\ No newline at end of file
+    measureTime: Mapped[int] = mapped_column(BIGINT, nullable=False)
+
+class MeasuresRollupMixin:
+    # Агрегати measures по кошиках: bucketTime - початок кошика (Unix, секунди)
+    resolution = 0
+
+    valueId: Mapped[int] = mapped_column(Integer, ForeignKey("value_items.id", ondelete="CASCADE", onupdate="CASCADE"), primary_key=True)
+    bucketTime: Mapped[int] = mapped_column(BIGINT, primary_key=True)
+    minValue: Mapped[float] = mapped_column(DOUBLE, nullable=False)
+    maxValue: Mapped[float] = mapped_column(DOUBLE, nullable=False)
+    sumValue: Mapped[float] = mapped_column(DOUBLE, nullable=False)
+    count: Mapped[int] = mapped_column(BIGINT, nullable=False)
+    firstTime: Mapped[int] = mapped_column(BIGINT, nullable=False)
+    firstValue: Mapped[float] = mapped_column(DOUBLE, nullable=False)
+    lastTime: Mapped[int] = mapped_column(BIGINT, nullable=False)
+    lastValue: Mapped[float] = mapped_column(DOUBLE, nullable=False)
+
+
+class MeasuresRollup1m(MeasuresRollupMixin, Base):
+    __tablename__ = "measures_rollup_1m"
+    resolution = 60
+
+
+class MeasuresRollup1h(MeasuresRollupMixin, Base):
+    __tablename__ = "measures_rollup_1h"
+    resolution = 3600
+
+
+class MeasuresRollup1d(MeasuresRollupMixin, Base):
+    __tablename__ = "measures_rollup_1d"
+    resolution = 86400
+
+
+class RollupCoverage(Base):
+    # Rollup-таблиці ряду повні для measureTime >= coveredFrom: записи до появи rollup-ів
+    # потрапляють туди лише через backfill_rollups. Немає рядка - rollup-ам ряду не довіряємо
+    __tablename__ = "rollup_coverage"
+
+    valueId: Mapped[int] = mapped_column(Integer, ForeignKey("value_items.id", ondelete="CASCADE", onupdate="CASCADE"), primary_key=True)
+    coveredFrom: Mapped[int] = mapped_column(BIGINT, nullable=False)
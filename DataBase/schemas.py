@@ -157,6 +157,12 @@ class MeasureCreate(BaseModel):
         orm_mode = True
 
 
+class MeasureBatchResult(BaseModel):
+    accepted: int
+    rejected: int
+    chunks: int
+
+
 class MeasureRead(MeasureBase):
     id: int
 
@@ -1,79 +1,361 @@
 # ActualDataRouters.py
 
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-from ActualDataForUser.ActualValuesData import ValuesDataContainer, HashedValue
+import json
+import os
+
+from fastapi import APIRouter, HTTPException, Query, WebSocket, WebSocketDisconnect
+from ActualDataForUser.ActualValuesData import ValuesDataContainer, CompactValuesContainer, HashedValue, is_valid_value
+from ActualDataForUser.MeasuresWriter import MeasuresWriter
+from ActualDataForUser.Subscriptions import SubscriptionIndex, is_pattern
+from ActualDataForUser.ClientSender import ClientSender, SLOW_CLIENT_POLICIES
+from ActualDataForUser.ClientInput import check_int, resume_point
+from ActualDataForUser.FastJson import dumps
+from ActualDataForUser.ProducerAcks import ProducerAcks
+from ActualDataForUser.BinaryProtocol import tag_ids, pack_sample, unpack_samples, SAMPLE_FORMAT
+from ActualDataForUser.WorkerBus import WorkerBus
+from ActualDataForUser.ValuesHistory import ValuesHistory
+import settings
 
 actual_data_router = APIRouter(prefix="/actual_data", tags=["ActualData"])
-value_vault = ValuesDataContainer()
+# compactValueStore = True - теги -> слоти, timestamp/value у суцільних масивах: утричі менше пам'яті
+# на 100k тегів, але оновлення і get_all повільніші (див. Benchmarks/values_container.py)
+value_vault = CompactValuesContainer() if getattr(settings, "compactValueStore", False) else ValuesDataContainer()
+# Останні historySize семплів тегів для трендів (historyWindow - додатково обмежує за часом).
+# За замовчуванням вимкнено: 120 семплів на кожен зі 100k тегів - це ~190 МБ;
+# historyTags обмежує історію потрібними тегами/шаблонами
+value_history = ValuesHistory(
+    getattr(settings, "historySize", 0),
+    getattr(settings, "historyWindow", None),
+    getattr(settings, "historyTags", None),
+    getattr(settings, "tagSeparator", "/")
+)
+# Запускається в main.py, якщо в settings увімкнено persistActualData
+measures_writer = MeasuresWriter()
+
+# Кожен клієнт має власну вихідну чергу з задачею відправки
+connected_clients: dict[WebSocket, ClientSender] = {}
+# tag -> клієнти, підписані на нього; шаблони "plant1/line3/*" - у префіксному дереві
+clients_query = SubscriptionIndex(getattr(settings, "tagSeparator", "/"))
+
+# Клієнти в бінарному режимі -> теги, id яких їм уже повідомлено
+binary_clients: dict[WebSocket, set[str]] = {}
+
+CLIENT_QUEUE_SIZE = getattr(settings, "clientQueueSize", 256)
+# Службових повідомлень (відповіді, ack) у черзі клієнта більше за це - клієнта від'єднано
+CLIENT_MESSAGE_QUEUE_SIZE = getattr(settings, "clientMessageQueueSize", 1024)
+SLOW_CLIENT_POLICY = getattr(settings, "slowClientPolicy", "drop_oldest")
+
+# liveStateBackend = "worker_bus" - стан реплікується між воркерами uvicorn, запускається в main.py
+worker_bus = WorkerBus(os.path.join(getattr(settings, "workerBusDir", "/tmp/live_state_bus"), "actual_data"))
+SNAPSHOT_CHUNK = 256
+
+
+def encode_value(v: HashedValue) -> str:
+    return dumps({"tag": v.tag, "timestamp": v.timestamp, "value": v.value})
+
+
+def render_values(items: dict) -> str:
+    # items: tag -> вже закодований JSON-фрагмент значення
+    return "[" + ",".join(items.values()) + "]"
+
+
+def encode_binary(v: HashedValue) -> bytes | None:
+    # Нечислове значення (його приймає ValuesDataContainer від JSON-продюсерів) у семпл
+    # не пакується - бінарні клієнти такого тегу не отримують
+    if not is_valid_value(v):
+        return None
+    return pack_sample(tag_ids.get_id(v.tag), v.timestamp, v.value)
+
+
+def render_binary(items: dict) -> bytes:
+    # items: tag -> упакований семпл (id, timestamp, value)
+    return b"".join(items.values())
+
+
+# protocol -> (кодування одного значення, збирання кадру)
+PROTOCOLS = {
+    "json": (encode_value, render_values),
+    "binary": (encode_binary, render_binary),
+}
+
+
+def protocol_of(websocket: WebSocket) -> str:
+    return "binary" if websocket in binary_clients else "json"
+
+
+def announce_tags(websocket: WebSocket, sender: ClientSender, tags) -> None:
+    # Бінарному клієнту треба знати id тегу до того, як прийде семпл з ним
+    known = binary_clients.get(websocket)
+    if known is None:
+        return
+    new_tags = [tag for tag in tags if tag not in known]
+    if new_tags:
+        known.update(new_tags)
+        sender.push_message(dumps({"dictionary": {tag: tag_ids.get_id(tag) for tag in new_tags}}))
+
+
+def send_values(websocket: WebSocket, sender: ClientSender, values: list[HashedValue]) -> None:
+    encode, render = PROTOCOLS[protocol_of(websocket)]
+    items = {}
+    for v in values:
+        fragment = encode(v)
+        if fragment is not None:
+            items[v.tag] = fragment
+    announce_tags(websocket, sender, items)
+    sender.push_message(render(items))
+
+
+def current_values(tags: list[str]) -> list[HashedValue]:
+    # Поточні значення для точних тегів і шаблонів
+    if not any(is_pattern(tag) for tag in tags):
+        return list(value_vault.get_many_values(tags).values())
+    matched = clients_query.matching(tags, value_vault.get_tags())
+    return list(value_vault.get_many_values(matched).values())
+
+
+def broadcast_values(values: list[HashedValue], exclude: WebSocket | None = None) -> None:
+    # Кожне значення кодується один раз на протокол, кадри збираються з готових фрагментів.
+    # Клієнти з однаковим набором змінених тегів отримують один і той самий кадр.
+    fragments = {"json": {}, "binary": {}}
+    frames: dict[tuple, str | bytes] = {}
+    # Лише кладемо оновлення в черги клієнтів, відправляють їхні задачі
+    for client, filtered_values in clients_query.group_by_client(values, lambda v: v.tag).items():
+        # Пропускаємо відправника
+        if client == exclude:
+            continue
+        client_sender = connected_clients.get(client)
+        if not client_sender:
+            continue
+        protocol = protocol_of(client)
+        encode, render = PROTOCOLS[protocol]
+        encoded = fragments[protocol]
+        items = {}
+        for v in filtered_values:
+            if v.tag in encoded:
+                fragment = encoded[v.tag]
+            else:
+                fragment = encoded[v.tag] = encode(v)
+            if fragment is not None:
+                items[v.tag] = fragment
+        if not items:
+            continue
+        announce_tags(client, client_sender, items)
+        key = (protocol, *items)
+        frame = frames.get(key)
+        if frame is None:
+            frame = frames[key] = render(items)
+        client_sender.push_update(items, frame)
 
-connected_clients: list[WebSocket] = []
-clients_query: dict[WebSocket, list[str]] = {}
+
+def apply_remote_values(rows: list) -> None:
+    # Оновлення від продюсера на іншому воркері; в measures його вже записав той воркер
+    values = [HashedValue(tag, timestamp, value) for tag, timestamp, value in rows]
+    value_vault.update_values(values)
+    value_history.record(values)
+    broadcast_values(values)
+
+
+def values_snapshot() -> list:
+    rows = [[v.tag, v.timestamp, v.value] for v in value_vault.get_all_values()]
+    return [rows[i:i + SNAPSHOT_CHUNK] for i in range(0, len(rows), SNAPSHOT_CHUNK)]
+
+
+worker_bus.subscribe("values", apply_remote_values, values_snapshot)
+
+
+def resume_values(tags: list[str] | None, since: int, epoch: int | None) -> tuple[list[HashedValue], bool]:
+    # Лише змінене після since; повний стан, якщо версія з іншої епохи (перезапуск, інший воркер)
+    # або більша за поточну. tags = None - усі теги
+    if epoch != value_vault.epoch or since > value_vault.version:
+        return (value_vault.get_all_values() if tags is None else current_values(tags)), True
+    if tags is not None and any(is_pattern(tag) for tag in tags):
+        tags = clients_query.matching(tags, value_vault.get_tags())
+    return value_vault.changed_since(since, tags), False
+
+
+def send_resumed(websocket: WebSocket, sender: ClientSender, tags: list[str] | None,
+                 since: int, epoch: int | None) -> None:
+    values, full = resume_values(tags, since, epoch)
+    send_values(websocket, sender, values)
+    # Після значень - версія, з якої продовжувати при наступному перепідключенні
+    sender.push_message(dumps({"version": value_vault.version, "epoch": value_vault.epoch, "full": full}))
+
+
+def recent_history(tags: list[str], start: int | None = None, limit: int | None = None) -> dict:
+    if any(is_pattern(tag) for tag in tags):
+        tags = clients_query.matching(tags, value_history.get_tags())
+    return value_history.get_many(tags, start, limit)
+
+
+def evict_client(websocket: WebSocket) -> None:
+    connected_clients.pop(websocket, None)
+    binary_clients.pop(websocket, None)
+    clients_query.remove_client(websocket)
+
+
+@actual_data_router.get("/persistence_stats")
+async def get_persistence_stats():
+    return measures_writer.get_stats()
+
+
+@actual_data_router.get("/history/{tag:path}")
+async def get_history(tag: str, start_time: int | None = None, limit: int | None = Query(None, ge=1)):
+    # Недавній тренд тегу з пам'яті, без запиту в БД
+    if not value_history.enabled:
+        raise HTTPException(status_code=404, detail="History is disabled (settings.historySize)")
+    if tag not in value_history.rings:
+        raise HTTPException(status_code=404, detail=f"No history for tag {tag}")
+    return value_history.get(tag, start_time, limit)
+
+
+@actual_data_router.get("/worker_bus_stats")
+async def get_worker_bus_stats():
+    return worker_bus.get_stats()
 
 
 @actual_data_router.websocket("")
-async def websocket_endpoint(websocket: WebSocket):
+async def websocket_endpoint(websocket: WebSocket, policy: str | None = None):
+    # policy (query-параметр) - що робити, якщо клієнт не встигає: drop_oldest, coalesce, disconnect
+    policy = policy or SLOW_CLIENT_POLICY
+    if policy not in SLOW_CLIENT_POLICIES:
+        await websocket.close(code=1008)
+        return
+
     await websocket.accept()
-    connected_clients.append(websocket)
+    sender = ClientSender(websocket, render_values, CLIENT_QUEUE_SIZE, policy, on_close=evict_client,
+                          max_messages=CLIENT_MESSAGE_QUEUE_SIZE)
+    connected_clients[websocket] = sender
+    # Підтвердження оновлень, якщо клієнт - продюсер (режим узгоджується запитом "producer")
+    acks = ProducerAcks(sender)
     # Кожен новий клієнт починає з порожнім списком підписок
-    clients_query[websocket] = []
+    clients_query.set_tags(websocket, [])
 
     try:
         while True:
-            data = await websocket.receive_json()
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+            if message.get("bytes") is not None:
+                # Бінарний кадр продюсера - це завжди оновлення з упакованих семплів
+                try:
+                    samples, unknown = unpack_samples(message["bytes"], tag_ids)
+                except ValueError as e:
+                    # Довжина кадру не кратна розміру семпла - кадр відхилено
+                    sender.push_message(dumps({"error": str(e)}))
+                    continue
+                if unknown and await tag_ids.refresh():
+                    # Можливо, рядки Values додали після завантаження реєстру
+                    samples, unknown = unpack_samples(message["bytes"], tag_ids)
+                if unknown:
+                    # Кадр відхилено цілком і без ack - продюсер має перезапитати словник
+                    sender.push_message(dumps({"error": "Unknown tag ids", "ids": sorted(set(unknown))[:100]}))
+                    continue
+                data = {"update": samples}
+            else:
+                data = json.loads(message["text"])
 
             if "update" in data:
                 # Оновлюємо дані, отримані від одного з клієнтів
+                if not acks.check_seq(data.get("seq")):
+                    continue
                 values = [HashedValue(**v) for v in data["update"]]
-                value_vault.update_values(values)
+                try:
+                    value_vault.update_values(values)
+                except ValueError as e:
+                    # Компактне сховище не приймає нечислові значення - пачку відхилено цілком
+                    sender.push_message(dumps({"error": str(e)}))
+                    continue
+                value_history.record(values)
+                # Логовані теги йдуть у чергу запису в measures
+                await measures_writer.offer(values)
 
                 # Підтвердження відправнику
-                await websocket.send_text("Values updated successfully")
+                acks.received(data.get("seq"))
 
                 # Відправляємо оновлення лише тим клієнтам, які підписані на ці теги
-                for client in connected_clients:
-                    # Пропускаємо відправника
-                    if client == websocket:
-                        continue
-
-                    # Фільтруємо оновлені значення
-                    tags_for_client = clients_query.get(client, [])
-                    filtered_values = [v for v in values if v.tag in tags_for_client]
-
-                    # Відправляємо, якщо є що відправляти
-                    if filtered_values:
-                        try:
-                            await client.send_json([
-                                {"tag": v.tag, "timestamp": v.timestamp, "value": v.value}
-                                for v in filtered_values
-                            ])
-                        except Exception:
-                            # Обробка помилок (наприклад, клієнт від'єднався)
-                            pass
+                broadcast_values(values, exclude=websocket)
+                # Інші воркери застосовують оновлення до своєї репліки і розсилають своїм клієнтам
+                worker_bus.publish("values", [[v.tag, v.timestamp, v.value] for v in values])
+
+            elif "producer" in data:
+                # Режим продюсера: без підтверджень або періодичні накопичені {"ack": seq, "lost": [...]}
+                acks.negotiate(data["producer"])
 
             elif "get" in data:
-                # Зберігаємо список тегів, на які підписався клієнт
+                # Зберігаємо список тегів (або шаблонів), на які підписався клієнт
                 tags_to_subscribe = data.get("get", [])
-                clients_query[websocket] = tags_to_subscribe
+                # Необов'язково: не частіше одного злитого повідомлення на max_rate_ms
+                try:
+                    resume = resume_point(data) if "since" in data else None
+                    sender.set_rate(data.get("max_rate_ms", 0))
+                except ValueError as e:
+                    sender.push_message(dumps({"error": str(e)}))
+                    continue
+                clients_query.set_tags(websocket, tags_to_subscribe)
 
                 # Відправляємо поточні значення для підписаних тегів
-                result = value_vault.get_many_values(tags_to_subscribe)
+                # {"since": N, "epoch": E} - лише змінені після версії N
+                if resume is not None:
+                    send_resumed(websocket, sender, tags_to_subscribe, *resume)
+                else:
+                    send_values(websocket, sender, current_values(tags_to_subscribe))
 
-                await websocket.send_json([
-                    {"tag": v.tag, "timestamp": v.timestamp, "value": v.value}
-                    for v in result.values()
-                ])
+            elif "subscribe" in data:
+                # Додаємо теги/шаблони до наявної підписки і віддаємо їхні поточні значення
+                added = clients_query.subscribe(websocket, data["subscribe"])
+                send_values(websocket, sender, current_values(added))
+
+            elif "unsubscribe" in data:
+                clients_query.unsubscribe(websocket, data["unsubscribe"])
+
+            elif "history" in data:
+                # Недавні семпли тегів/шаблонів з кільцевих буферів: {"history": [...], "from": ts, "limit": n}
+                tags = data["history"]
+                try:
+                    if not isinstance(tags, list) or not all(isinstance(tag, str) for tag in tags):
+                        raise ValueError("history must be a list of tags")
+                    start = check_int("from", data.get("from"))
+                    limit = check_int("limit", data.get("limit"), 1)
+                except ValueError as e:
+                    sender.push_message(dumps({"error": str(e)}))
+                    continue
+                sender.push_message(dumps({"history": recent_history(tags, start, limit)}))
 
             elif "get_all" in data:
                 # Клієнт просить усі актуальні значення
-                clients_query[websocket] = []  # Очищаємо підписку, якщо була
-                result = value_vault.get_all_values()
-                await websocket.send_json([
-                    {"tag": v.tag, "timestamp": v.timestamp, "value": v.value}
-                    for v in result
-                ])
+                try:
+                    resume = resume_point(data) if "since" in data else None
+                except ValueError as e:
+                    sender.push_message(dumps({"error": str(e)}))
+                    continue
+                clients_query.set_tags(websocket, [])  # Очищаємо підписку, якщо була
+                if resume is not None:
+                    send_resumed(websocket, sender, None, *resume)
+                else:
+                    send_values(websocket, sender, value_vault.get_all_values())
+
+            elif "protocol" in data:
+                # Перемикання формату: "binary" - семпли (id, timestamp, value) по 20 байт,
+                # теги замінюються на Values.id після обміну словником; "json" - як раніше
+                if data["protocol"] == "binary":
+                    if not tag_ids.loaded:
+                        await tag_ids.load()
+                    binary_clients[websocket] = set(tag_ids.tag_to_id)
+                    sender.set_render(render_binary)
+                    sender.push_message(dumps({
+                        "protocol": "binary",
+                        "sample_format": SAMPLE_FORMAT,
+                        "dictionary": tag_ids.tag_to_id
+                    }))
+                else:
+                    binary_clients.pop(websocket, None)
+                    sender.set_render(render_values)
+                    sender.push_message(dumps({"protocol": "json"}))
 
     except WebSocketDisconnect:
-        connected_clients.remove(websocket)
-        # Очищаємо підписки від'єднаного клієнта
-        if websocket in clients_query:
-            del clients_query[websocket]
\ No newline at end of file
+        pass
+    finally:
+        # Зупиняємо задачу відправки і очищаємо підписки від'єднаного клієнта
+        acks.close()
+        await sender.close()
+        evict_client(websocket)
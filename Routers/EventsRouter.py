@@ -1,19 +1,105 @@
+import os
+
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 from ActualDataForUser.EventsData import EventDataContainer
 from DataBase.schemas import EventUpdate, EventGet
+from ActualDataForUser.Subscriptions import SubscriptionIndex
+from ActualDataForUser.ClientSender import ClientSender, SLOW_CLIENT_POLICIES
+from ActualDataForUser.ClientInput import resume_point
+from ActualDataForUser.FastJson import dumps
+from ActualDataForUser.ProducerAcks import ProducerAcks
+from ActualDataForUser.WorkerBus import WorkerBus
+import settings
 
 events_router = APIRouter(prefix="/events", tags=["Events"])
 value_vault = EventDataContainer()
 
-connected_clients: list[WebSocket] = []
-clients_query: dict[WebSocket, list[str]] = {}
+# Кожен клієнт має власну вихідну чергу з задачею відправки
+connected_clients: dict[WebSocket, ClientSender] = {}
+# tag -> клієнти, підписані на нього
+clients_query = SubscriptionIndex()
+
+CLIENT_QUEUE_SIZE = getattr(settings, "clientQueueSize", 256)
+CLIENT_MESSAGE_QUEUE_SIZE = getattr(settings, "clientMessageQueueSize", 1024)
+SLOW_CLIENT_POLICY = getattr(settings, "slowClientPolicy", "drop_oldest")
+
+# liveStateBackend = "worker_bus" - стан реплікується між воркерами uvicorn, запускається в main.py
+worker_bus = WorkerBus(os.path.join(getattr(settings, "workerBusDir", "/tmp/live_state_bus"), "events"))
+SNAPSHOT_CHUNK = 64
+
+
+def encode_event(tag: str, events: dict) -> str:
+    return dumps(tag) + ":" + dumps(events)
+
+
+def render_events(items: dict) -> str:
+    # items: tag -> (події, закодований фрагмент або None, якщо події злиті)
+    return "{" + ",".join(
+        fragment if fragment is not None else encode_event(tag, events)
+        for tag, (events, fragment) in items.items()
+    ) + "}"
+
+
+def merge_events(merged: dict, items: dict) -> None:
+    # Події оновлюються частково (по enum), тому зливаємо вкладені словники
+    for tag, (events, fragment) in items.items():
+        if tag in merged:
+            merged[tag] = ({**merged[tag][0], **events}, None)
+        else:
+            merged[tag] = (events, fragment)
+
+
+def broadcast_events(update: dict, exclude: WebSocket | None = None) -> None:
+    # Кожен тег кодується в JSON один раз, кадри збираються з готових фрагментів
+    fragments = {tag: (events, encode_event(tag, events)) for tag, events in update.items()}
+    frames: dict[tuple, str] = {}
+    for client, tags in clients_query.group_by_client(update, lambda tag: tag).items():
+        if client == exclude:
+            continue
+        client_sender = connected_clients.get(client)
+        if client_sender:
+            items = {tag: fragments[tag] for tag in tags}
+            key = tuple(items)
+            frame = frames.get(key)
+            if frame is None:
+                frame = frames[key] = render_events(items)
+            client_sender.push_update(items, frame)
+
+
+def apply_remote_events(update: dict) -> None:
+    # Після JSON ключі enum стали рядками - повертаємо int, як у EventUpdate
+    update = {tag: {int(enum): status for enum, status in events.items()} for tag, events in update.items()}
+    value_vault.update_event(update)
+    broadcast_events(update)
+
+
+def events_snapshot() -> list:
+    tags = list(value_vault.get_all_events().items())
+    return [dict(tags[i:i + SNAPSHOT_CHUNK]) for i in range(0, len(tags), SNAPSHOT_CHUNK)]
+
+
+worker_bus.subscribe("events", apply_remote_events, events_snapshot)
+
+
+def evict_client(websocket: WebSocket) -> None:
+    connected_clients.pop(websocket, None)
+    clients_query.remove_client(websocket)
 
 
 @events_router.websocket("")
-async def websocket_endpoint(websocket: WebSocket):
+async def websocket_endpoint(websocket: WebSocket, policy: str | None = None):
+    policy = policy or SLOW_CLIENT_POLICY
+    if policy not in SLOW_CLIENT_POLICIES:
+        await websocket.close(code=1008)
+        return
+
     await websocket.accept()
-    connected_clients.append(websocket)
-    clients_query[websocket] = []
+    sender = ClientSender(websocket, render_events, CLIENT_QUEUE_SIZE, policy, on_close=evict_client,
+                          merge=merge_events, max_messages=CLIENT_MESSAGE_QUEUE_SIZE)
+    connected_clients[websocket] = sender
+    # Підтвердження оновлень, якщо клієнт - продюсер (режим узгоджується запитом "producer")
+    acks = ProducerAcks(sender)
+    clients_query.set_tags(websocket, [])
 
     try:
         while True:
@@ -21,35 +107,55 @@ async def websocket_endpoint(websocket: WebSocket):
 
             if "update" in data:
                 # Оновлюємо дані. Тут data["update"] - це вже словник
+                if not acks.check_seq(data.get("seq")):
+                    continue
                 payload = EventUpdate(**data)
                 value_vault.update_event(payload.update)
-                await websocket.send_text("Values updated successfully")
+                acks.received(data.get("seq"))
                 # Відправляємо оновлення лише тим клієнтам, які підписані на ці теги
-                for client in connected_clients:
-                    if client == websocket:
-                        continue
-                    subscribed_tags = clients_query[client]
-                    events_to_send = {
-                        tag: payload.update[tag]
-                        for tag in subscribed_tags if tag in payload.update
-                    }
-                    if events_to_send:
-                        try:
-                            await client.send_json(events_to_send)
-                        except Exception:
-                            pass
+                broadcast_events(payload.update, exclude=websocket)
+                worker_bus.publish("events", payload.update)
+
+            elif "producer" in data:
+                # Режим продюсера: без підтверджень або періодичні накопичені {"ack": seq, "lost": [...]}
+                acks.negotiate(data["producer"])
 
             elif "get" in data:
                 # Зберігаємо список тегів, на які підписався клієнт
                 payload = EventGet(**data)
-                clients_query[websocket] = payload.get
-                result = {
-                    event_type: value_vault.get_event(event_type)
-                    for event_type in payload.get
-                }
-                await websocket.send_json({"get_response": result})
+                # Необов'язково: не частіше одного злитого повідомлення на max_rate_ms
+                try:
+                    resume = resume_point(data) if "since" in data else None
+                    sender.set_rate(data.get("max_rate_ms", 0))
+                except ValueError as e:
+                    sender.push_message(dumps({"error": str(e)}))
+                    continue
+                clients_query.set_tags(websocket, payload.get)
+                if resume is not None:
+                    # {"since": N, "epoch": E} - лише теги, змінені після версії N;
+                    # повний стан, якщо версія з іншої епохи або більша за поточну
+                    since, epoch = resume
+                    full = epoch != value_vault.epoch or since > value_vault.version
+                    result = (
+                        {event_type: value_vault.get_event(event_type) for event_type in payload.get}
+                        if full else value_vault.changed_since(since, payload.get)
+                    )
+                    sender.push_message(dumps({
+                        "get_response": result,
+                        "version": value_vault.version,
+                        "epoch": value_vault.epoch,
+                        "full": full
+                    }))
+                else:
+                    result = {
+                        event_type: value_vault.get_event(event_type)
+                        for event_type in payload.get
+                    }
+                    sender.push_message(dumps({"get_response": result}))
 
     except WebSocketDisconnect:
-        connected_clients.remove(websocket)
-        if websocket in clients_query:
-            del clients_query[websocket]
\ No newline at end of file
+        pass
+    finally:
+        acks.close()
+        await sender.close()
+        evict_client(websocket)
@@ -1,27 +1,112 @@
 # MeasuresRouter.py
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-from fastapi.responses import HTMLResponse
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import HTMLResponse, StreamingResponse, FileResponse
+from starlette.background import BackgroundTask
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy import and_
 
-from DataBase.database import get_session
+from DataBase.database import get_session, AsyncSessionLocal
 from DataBase.models import Measures, Values
-from DataBase.schemas import MeasureCreate, MeasureRead, MeasureUpdate, MeasureDelete
-from Routers.crud import create_unit, get_all_units, delete_unit
+from DataBase.schemas import MeasureCreate, MeasureRead, MeasureUpdate, MeasureDelete, MeasureBatchResult
+from Routers.crud import get_all_units
+from Routers.downsampling import downsample, DOWNSAMPLING_METHODS
+from Routers.measures_query import parse_value_ids, get_values_meta, fetch_series, fetch_page, insert_measures, iter_measures, \
+    aggregate_series, AGGREGATE_FUNCTIONS
+from Routers.rollups import ROLLUP_BY_NAME, choose_rollup, fetch_rollup_series, update_rollups, recompute_rollup_buckets, \
+    rollups_cover
+from Routers.retention import RetentionJob
+from Routers.arrow_export import ARROW_FORMATS, arrow_available, write_measures_file
+from Routers.result_cache import ResultCache
+import settings
 
 from typing import List
+import gzip
+import hashlib
 import json
-from datetime import datetime
+import math
+import os
+import tempfile
+import time
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
 
 measures_router = APIRouter(prefix="/measures", tags=["Measures"])
+# Запускається в main.py, якщо в settings увімкнено retentionEnabled
+retention_job = RetentionJob(
+    interval=getattr(settings, "retentionIntervalSeconds", 3600),
+    archive_dir=getattr(settings, "archiveDir", None)
+)
+# Кеш відповідей /chart_data і /aggregate
+result_cache = ResultCache(
+    max_bytes=getattr(settings, "resultCacheMaxBytes", 64 * 1024 * 1024),
+    live_ttl=getattr(settings, "resultCacheLiveTtl", 5.0)
+)
 
 
 # CREATE
 @measures_router.post("/create", response_model=MeasureRead)
 async def create_measure(measure: MeasureCreate, session: AsyncSession = Depends(get_session)):
-    return await create_unit(measure, Measures, session)
+    # Сирий рядок і rollup-кошики - в одній транзакції
+    new_measure = Measures(**measure.dict())
+    session.add(new_measure)
+    try:
+        await session.flush()
+        await update_rollups([{
+            "valueId": new_measure.valueId,
+            "measureValue": new_measure.measureValue,
+            "measureTime": new_measure.measureTime
+        }], session)
+        await session.commit()
+    except Exception:
+        await session.rollback()
+        raise
+    await session.refresh(new_measure)
+    return new_measure
+
+
+# CREATE BATCH
+@measures_router.post("/create_batch", response_model=MeasureBatchResult)
+async def create_measures_batch(
+        measures: list[MeasureCreate],
+        chunk_size: int = Query(1000, ge=1, le=10000, description="Rows per multi-row INSERT"),
+        session: AsyncSession = Depends(get_session)
+):
+    """
+    Пакетний запис вимірів: багаторядкові INSERT частинами в одній транзакції.
+    Рядки з неіснуючим valueId або нескінченним значенням відкидаються і рахуються в rejected.
+    """
+    if not measures:
+        return MeasureBatchResult(accepted=0, rejected=0, chunks=0)
+
+    requested_ids = {m.valueId for m in measures}
+    ids_result = await session.execute(select(Values.id).where(Values.id.in_(requested_ids)))
+    known_ids = set(ids_result.scalars().all())
+
+    now = int(time.time())
+    rows = [
+        {
+            "valueId": m.valueId,
+            "measureValue": m.measureValue,
+            "measureTime": m.measureTime if m.measureTime is not None else now
+        }
+        for m in measures
+        if m.valueId in known_ids and math.isfinite(m.measureValue)
+    ]
+
+    try:
+        accepted = await insert_measures(rows, session, chunk_size)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Batch insert failed: {str(e)}")
+
+    return MeasureBatchResult(
+        accepted=accepted,
+        rejected=len(measures) - accepted,
+        chunks=math.ceil(accepted / chunk_size)
+    )
 
 
 # GET ALL
@@ -30,99 +115,306 @@ async def get_all_measures(session: AsyncSession = Depends(get_session)):
     return await get_all_units(Measures, session)
 
 
+@measures_router.get("/retention_stats")
+async def get_retention_stats():
+    return {"running": retention_job.is_running, "archive_dir": retention_job.archive_dir,
+            **retention_job.stats.__dict__}
+
+
+# AGGREGATE
+@measures_router.get("/aggregate")
+async def aggregate_measures(
+        request: Request,
+        value_ids: str = Query(..., description="Comma-separated list of value IDs"),
+        start: int = Query(..., description="Start time in Unix timestamp"),
+        end: int = Query(..., description="End time in Unix timestamp"),
+        bucket: int = Query(3600, ge=1, description="Bucket size in seconds"),
+        fn: str = Query("avg,min,max,count", description="Comma-separated: avg, min, max, count, sum")
+):
+    """
+    Агрегати вимірів по часових кошиках, пораховані в БД. Відповідь колонкова:
+    для кожного value - масив початків кошиків t і по масиву на кожну функцію.
+    """
+    try:
+        ids = parse_value_ids(value_ids)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid value IDs format: {str(e)}")
+    if not ids:
+        raise HTTPException(status_code=400, detail="No value IDs provided")
+
+    functions = [f.strip() for f in fn.split(',') if f.strip()]
+    unknown = [f for f in functions if f not in AGGREGATE_FUNCTIONS]
+    if not functions or unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown aggregate functions: {', '.join(unknown)}")
+    if end < start:
+        raise HTTPException(status_code=400, detail="end must not be before start")
+
+    async def compute() -> bytes:
+        # Власна сесія: обчислення може пережити запит, що його почав
+        async with AsyncSessionLocal() as session:
+            source, series = await aggregate_series(ids, start, end, bucket, functions, session)
+        return encode_json({
+            "bucket": bucket,
+            "source": source,
+            "series": {str(value_id): columns for value_id, columns in series.items()}
+        })
+
+    key = ("aggregate", tuple(ids), start, end, bucket, tuple(functions))
+    return await cached_json_response(request, key, result_cache.ttl_for_range(end), compute)
+
+
+@measures_router.get("/cache_stats")
+async def get_cache_stats():
+    return result_cache.get_stats()
+
+
+# STREAMING EXPORT
+def parse_export_ids(value_ids: str | None) -> List[int] | None:
+    # Параметр не задано - експорт усіх рядів; задано, але без жодного id ("," або "") - помилка,
+    # а не вивантаження всієї таблиці
+    if value_ids is None:
+        return None
+    try:
+        ids = parse_value_ids(value_ids)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid value IDs format: {str(e)}")
+    if not ids:
+        raise HTTPException(status_code=400, detail="No value IDs provided")
+    return ids
+
+
+def json_number(value) -> str:
+    # NaN/Infinity - не JSON: такі значення віддаються як null
+    value = float(value)
+    return json.dumps(value) if math.isfinite(value) else "null"
+
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+@measures_router.get("/export")
+async def export_measures(
+        value_ids: str | None = Query(None, description="Comma-separated list of value IDs (default: all)"),
+        start_time: int | None = Query(None, description="Start time in Unix timestamp"),
+        end_time: int | None = Query(None, description="End time in Unix timestamp"),
+        format: str = Query("ndjson", description="ndjson or csv")
+):
+    """
+    Потоковий експорт вимірів. Рядки читаються з серверного курсора і віддаються частинами,
+    тож пам'ять не залежить від кількості рядків.
+    """
+    if format not in EXPORT_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"Unknown export format: {format}")
+    ids = parse_export_ids(value_ids)
+
+    async def generate():
+        if format == "csv":
+            yield "id,valueId,measureValue,measureTime\n"
+        async for partition in iter_measures(ids, start_time, end_time):
+            if format == "csv":
+                yield "".join(f"{r[0]},{r[1]},{float(r[2])!r},{r[3]}\n" for r in partition)
+            else:
+                yield "".join(
+                    f'{{"id":{r[0]},"valueId":{r[1]},"measureValue":{json_number(r[2])},"measureTime":{r[3]}}}\n'
+                    for r in partition
+                )
+
+    return StreamingResponse(
+        generate(),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="measures.{format}"'}
+    )
+
+
+# COLUMNAR EXPORT
+@measures_router.get("/export_columnar")
+async def export_measures_columnar(
+        value_ids: str | None = Query(None, description="Comma-separated list of value IDs (default: all)"),
+        start_time: int | None = Query(None, description="Start time in Unix timestamp"),
+        end_time: int | None = Query(None, description="End time in Unix timestamp"),
+        format: str = Query("parquet", description="parquet or arrow")
+):
+    """
+    Експорт у Parquet або Arrow IPC. Файл збирається на диску по row group з курсора
+    і віддається як завантаження, після чого видаляється.
+    """
+    if format not in ARROW_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unknown export format: {format}")
+    if not arrow_available():
+        raise HTTPException(status_code=501, detail="pyarrow is not installed on the server")
+    ids = parse_export_ids(value_ids)
+
+    media_type, extension = ARROW_FORMATS[format]
+    fd, path = tempfile.mkstemp(suffix=f".{extension}")
+    os.close(fd)
+    try:
+        await write_measures_file(path, ids, start_time, end_time, format)
+    except Exception as e:
+        os.remove(path)
+        raise HTTPException(status_code=500, detail=f"Export failed: {str(e)}")
+
+    return FileResponse(path, media_type=media_type, filename=f"measures.{extension}",
+                        background=BackgroundTask(os.remove, path))
+
+
 # GET BY VALUE ID
 @measures_router.get("/get_by_value_id/{value_id}", response_model=list[MeasureRead])
-async def get_by_value_id(value_id: int, session: AsyncSession = Depends(get_session)):
-    result = await session.execute(select(Measures).where(Measures.valueId == value_id))
-    measures = result.scalars().all()
-    if not measures:
+async def get_by_value_id(
+        value_id: int,
+        response: Response,
+        start_time: int | None = Query(None, description="Start time in Unix timestamp"),
+        end_time: int | None = Query(None, description="End time in Unix timestamp"),
+        limit: int = Query(10000, ge=1, le=100000, description="Max rows per page"),
+        cursor: str | None = Query(None, description="Continuation cursor from X-Next-Cursor header"),
+        session: AsyncSession = Depends(get_session)
+):
+    """
+    Виміри value_id сторінками в порядку часу. Якщо є наступна сторінка,
+    її курсор повертається в заголовку X-Next-Cursor.
+    """
+    try:
+        measures, next_cursor = await fetch_page(value_id, session, start_time, end_time, limit, cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    if not measures and cursor is None:
         value_result = await session.execute(select(Values).where(Values.id == value_id))
         value_unit = value_result.scalar_one_or_none()
         if not value_unit:
             raise HTTPException(status_code=404, detail=f"Value with id {value_id} not found")
         raise HTTPException(status_code=404, detail=f"No measures found for value {value_unit.name}")
+
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return measures
 
 
 # DELETE
 @measures_router.delete("/delete/{measure_id}")
 async def delete_measure(measure_id: int, session: AsyncSession = Depends(get_session)):
-    try:
-        return await delete_unit(Measures, measure_id, session)
-    except HTTPException:
+    measure = await session.get(Measures, measure_id)
+    if not measure:
         raise HTTPException(status_code=404, detail="Measure not found")
+    point = (measure.valueId, measure.measureTime)
+    try:
+        await session.delete(measure)
+        await session.flush()
+        await recompute_rollup_buckets([point], session)
+        await session.commit()
+    except Exception:
+        await session.rollback()
+        raise
+    return {"ok": True}
 
 
-# ГЕНЕРАЦІЯ ГРАФІКА - ПОВЕРТАЄ ГОТОВУ HTML СТОРІНКУ
-@measures_router.get("/chart", response_class=HTMLResponse)
-async def generate_chart(
+
+async def load_chart_series(ids: List[int], start_time: int, end_time: int, max_points: int,
+                            method: str, resolution: str, session: AsyncSession) -> list:
+    # Один запит на метадані і один на виміри всіх рядів
+    values_meta = await get_values_meta(ids, session)
+    # На довгих проміжках читаємо найгрубшу rollup-таблицю, якої ще вистачає на max_points
+    if resolution == "auto":
+        rollup_model = choose_rollup(start_time, end_time, max_points)
+        if rollup_model is not None and not await rollups_cover(list(values_meta), start_time, session):
+            rollup_model = None
+    else:
+        rollup_model = ROLLUP_BY_NAME.get(resolution)
+
+    if rollup_model is None:
+        series = await fetch_series(list(values_meta), start_time, end_time, session)
+    else:
+        series = await fetch_rollup_series(rollup_model, list(values_meta), start_time, end_time, session)
+
+    result = []
+    for value_id in ids:
+        if value_id not in values_meta or value_id not in series:
+            continue
+
+        name, tag = values_meta[value_id]
+        times, values = series[value_id]
+
+        # Проріджуємо ряд до max_points, щоб розмір відповіді не залежав від довжини проміжку
+        ts, vs = downsample([int(t) for t in times], [float(v) for v in values], max_points, method)
+
+        result.append({"label": name, "tag": tag if tag else "N/A", "t": ts, "v": vs})
+    return result
+
+
+def encode_json(payload) -> bytes:
+    return json.dumps(payload, separators=(",", ":")).encode("utf-8")
+
+
+def choose_encoding(request: Request) -> str | None:
+    # brotli, якщо клієнт його приймає і модуль встановлено, інакше gzip
+    accept_encoding = request.headers.get("accept-encoding", "")
+    if brotli is not None and "br" in accept_encoding:
+        return "br"
+    if "gzip" in accept_encoding:
+        return "gzip"
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=5)
+    return gzip.compress(body, compresslevel=6)
+
+
+async def cached_json_response(request: Request, key, ttl, compute) -> Response:
+    # У кеші лежать і сирий JSON, і стиснуті варіанти: повторний запит не стискає заново
+    encoding = choose_encoding(request)
+    headers = {"Vary": "Accept-Encoding"}
+    if encoding is None:
+        body = await result_cache.get_or_compute(key, ttl, compute)
+    else:
+        async def compute_compressed() -> bytes:
+            return compress(await result_cache.get_or_compute(key, ttl, compute), encoding)
+
+        body = await result_cache.get_or_compute((key, encoding), ttl, compute_compressed)
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+# ДАНІ ДЛЯ ГРАФІКА - КОЛОНКОВІ МАСИВИ t (Unix, секунди) І v
+@measures_router.get("/chart_data")
+async def get_chart_data(
+        request: Request,
         value_ids: str = Query(..., description="Comma-separated list of value IDs"),
         start_time: int = Query(..., description="Start time in Unix timestamp"),
         end_time: int = Query(..., description="End time in Unix timestamp"),
-        session: AsyncSession = Depends(get_session)
+        max_points: int = Query(2000, ge=10, le=100000, description="Max points per series after downsampling"),
+        method: str = Query("minmax", description="Downsampling method: minmax or lttb"),
+        resolution: str = Query("auto", description="auto, raw, 1m, 1h or 1d")
 ):
-    """
-    Генерує готову HTML сторінку з графіком з автоматичною оптимізацією
-    """
+    if method not in DOWNSAMPLING_METHODS:
+        raise HTTPException(status_code=400, detail=f"Unknown downsampling method: {method}")
+    if resolution not in ("auto", "raw") and resolution not in ROLLUP_BY_NAME:
+        raise HTTPException(status_code=400, detail=f"Unknown resolution: {resolution}")
 
     try:
         # Парсимо ID значень
         try:
-            ids = [int(id.strip()) for id in value_ids.split(',')]
+            ids = parse_value_ids(value_ids)
         except ValueError as e:
             raise HTTPException(status_code=400, detail=f"Invalid value IDs format: {str(e)}")
 
         if not ids:
             raise HTTPException(status_code=400, detail="No value IDs provided")
 
-        # Збираємо дані для кожного value_id
-        datasets = []
-
-        for value_id in ids:
-            try:
-                # Отримуємо інформацію про Value
-                value_result = await session.execute(select(Values).where(Values.id == value_id))
-                value = value_result.scalar_one_or_none()
-
-                if not value:
-                    continue
-
-                # Отримуємо виміри в заданому часовому проміжку
-                measures_result = await session.execute(
-                    select(Measures)
-                    .where(
-                        and_(
-                            Measures.valueId == value_id,
-                            Measures.measureTime >= start_time,
-                            Measures.measureTime <= end_time
-                        )
-                    )
-                    .order_by(Measures.measureTime)
-                )
-                measures = measures_result.scalars().all()
-
-                if not measures:
-                    continue
-
-                datasets.append({
-                    "label": value.name,
-                    "tag": value.tag if value.tag else "N/A",
-                    "data": [
-                        {"x": int(m.measureTime) * 1000, "y": float(m.measureValue)}
-                        for m in measures
-                    ]
-                })
-
-            except Exception:
-                continue
-
-        if not datasets:
-            raise HTTPException(status_code=404, detail="No data found for the specified parameters")
-
-        # Генеруємо HTML
-        html = generate_chart_html(datasets, start_time, end_time)
+        async def compute() -> bytes:
+            # Власна сесія: обчислення може пережити запит, що його почав
+            async with AsyncSessionLocal() as session:
+                series = await load_chart_series(ids, start_time, end_time, max_points, method, resolution, session)
+            if not series:
+                raise HTTPException(status_code=404, detail="No data found for the specified parameters")
+            return encode_json({"series": series})
 
-        return HTMLResponse(content=html)
+        # Однакові запити від кількох операторів обслуговує один запит до БД
+        key = ("chart_data", tuple(ids), start_time, end_time, resolution, max_points, method)
+        return await cached_json_response(request, key, result_cache.ttl_for_range(end_time), compute)
 
     except HTTPException:
         raise
@@ -130,9 +422,24 @@ async def generate_chart(
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 
-def generate_chart_html(datasets: list, start_time: int, end_time: int) -> str:
+# ГРАФІК - СТАТИЧНА HTML ОБОЛОНКА, ДАНІ ПІДТЯГУЮТЬСЯ З /chart_data
+@measures_router.get("/chart", response_class=HTMLResponse)
+async def generate_chart(request: Request):
     """
-    Генерує HTML сторінку з графіком, оптимізовану для перегляду та друку на А4 landscape
+    Повертає HTML сторінку з графіком. Параметри (value_ids, start_time, end_time, max_points,
+    method, resolution) сторінка передає в /measures/chart_data.
+    """
+    headers = {"ETag": CHART_ETAG, "Cache-Control": "public, max-age=86400"}
+    if request.headers.get("if-none-match") == CHART_ETAG:
+        return Response(status_code=304, headers=headers)
+    return HTMLResponse(content=CHART_HTML, headers=headers)
+
+
+def generate_chart_html() -> str:
+    """
+    Генерує HTML оболонку графіка, оптимізовану для перегляду та друку на А4 landscape.
+    Дані сторінка бере з /measures/chart_data з тими ж параметрами запиту, тому оболонка
+    однакова для всіх графіків і кешується браузером.
     """
 
     # Кольори для різних ліній
@@ -149,19 +456,7 @@ def generate_chart_html(datasets: list, start_time: int, end_time: int) -> str:
         'rgb(99, 255, 132)'
     ]
 
-    for idx, dataset in enumerate(datasets):
-        color = colors[idx % len(colors)]
-        dataset['borderColor'] = color
-        dataset['backgroundColor'] = color.replace('rgb', 'rgba').replace(')', ', 0.1)')
-        dataset['tension'] = 0.1
-        dataset['pointRadius'] = 0
-        dataset['pointHoverRadius'] = 0
-        dataset['borderWidth'] = 2
-
-    datasets_json = json.dumps(datasets)
-
-    start_dt = datetime.fromtimestamp(start_time).strftime('%d.%m.%Y %H:%M')
-    end_dt = datetime.fromtimestamp(end_time).strftime('%d.%m.%Y %H:%M')
+    colors_json = json.dumps(colors)
 
     html = f"""
 <!DOCTYPE html>
@@ -442,7 +737,7 @@ def generate_chart_html(datasets: list, start_time: int, end_time: int) -> str:
     <div class="container">
         <div class="header">
             <h1>📊 Графік вимірів</h1>
-            <p>Часовий проміжок: {start_dt} - {end_dt}</p>
+            <p id="range"></p>
         </div>
 
         <div class="chart-container">
@@ -458,117 +753,160 @@ def generate_chart_html(datasets: list, start_time: int, end_time: int) -> str:
     </div>
 
     <script>
-        const datasets = {datasets_json};
-
-        const ctx = document.getElementById('myChart').getContext('2d');
-        const myChart = new Chart(ctx, {{
-            type: 'line',
-            data: {{
-                datasets: datasets
-            }},
-            options: {{
-                responsive: true,
-                maintainAspectRatio: false,
-                layout: {{
-                    padding: {{
-                        left: 12,
-                        right: 30,
-                        top: 20,
-                        bottom: 20
-                    }}
-                }},
-                interaction: {{
-                    mode: 'nearest',
-                    intersect: false,
-                    axis: 'x'
+        const colors = {colors_json};
+        const params = new URLSearchParams(window.location.search);
+
+        const formatTime = ts => new Date(Number(ts) * 1000).toLocaleString('uk-UA', {{
+            timeZone: 'Europe/Kiev',
+            year: 'numeric',
+            month: '2-digit',
+            day: '2-digit',
+            hour: '2-digit',
+            minute: '2-digit'
+        }});
+        document.getElementById('range').textContent =
+            `Часовий проміжок: ${{formatTime(params.get('start_time'))}} - ${{formatTime(params.get('end_time'))}}`;
+
+        fetch('chart_data?' + params.toString())
+            .then(response => {{
+                if (!response.ok) {{
+                    return response.json().then(err => {{ throw new Error(err.detail || response.statusText); }});
+                }}
+                return response.json();
+            }})
+            .then(payload => renderChart(payload.series.map((series, idx) => {{
+                const color = colors[idx % colors.length];
+                return {{
+                    label: series.label,
+                    tag: series.tag,
+                    data: series.t.map((t, i) => ({{ x: t * 1000, y: series.v[i] }})),
+                    borderColor: color,
+                    backgroundColor: color.replace('rgb', 'rgba').replace(')', ', 0.1)'),
+                    tension: 0.1,
+                    pointRadius: 0,
+                    pointHoverRadius: 0,
+                    borderWidth: 2
+                }};
+            }})))
+            .catch(error => {{
+                document.getElementById('legend').textContent = 'Помилка завантаження даних: ' + error.message;
+            }});
+
+        function renderChart(datasets) {{
+            const ctx = document.getElementById('myChart').getContext('2d');
+            const myChart = new Chart(ctx, {{
+                type: 'line',
+                data: {{
+                    datasets: datasets
                 }},
-                plugins: {{
-                    legend: {{
-                        position: 'top',
-                        labels: {{
-                            font: {{ size: 13, weight: 'bold' }},
-                            padding: 16,
-                            boxWidth: 20,
-                            usePointStyle: true
+                options: {{
+                    responsive: true,
+                    maintainAspectRatio: false,
+                    layout: {{
+                        padding: {{
+                            left: 12,
+                            right: 30,
+                            top: 20,
+                            bottom: 20
                         }}
                     }},
-                    tooltip: {{
-                        callbacks: {{
-                            title: function(context) {{
-                                const date = new Date(context[0].parsed.x);
-                                return date.toLocaleString('uk-UA', {{
-                                    timeZone: 'Europe/Kiev',
-                                    year: 'numeric',
-                                    month: '2-digit',
-                                    day: '2-digit',
-                                    hour: '2-digit',
-                                    minute: '2-digit',
-                                    second: '2-digit'
-                                }});
-                            }},
-                            label: function(context) {{
-                                return context.dataset.label + ': ' + context.parsed.y.toFixed(2);
+                    interaction: {{
+                        mode: 'nearest',
+                        intersect: false,
+                        axis: 'x'
+                    }},
+                    plugins: {{
+                        legend: {{
+                            position: 'top',
+                            labels: {{
+                                font: {{ size: 13, weight: 'bold' }},
+                                padding: 16,
+                                boxWidth: 20,
+                                usePointStyle: true
                             }}
-                        }}
-                    }}
-                }},
-                scales: {{
-                    x: {{
-                        type: 'time',
-                        time: {{
-                            unit: 'hour',
-                            displayFormats: {{
-                                hour: 'HH:mm',
-                                day: 'dd.MM'
-                            }},
-                            tooltipFormat: 'dd.MM.yyyy HH:mm:ss'
-                        }},
-                        title: {{
-                            display: true,
-                            text: 'Час',
-                            font: {{ size: 14, weight: 'bold' }}
                         }},
-                        ticks: {{
-                            maxRotation: 45,
-                            minRotation: 45,
-                            autoSkip: true,
-                            maxTicksLimit: 16
-                        }},
-                        grid: {{
-                            color: 'rgba(0,0,0,0.12)'
+                        tooltip: {{
+                            callbacks: {{
+                                title: function(context) {{
+                                    const date = new Date(context[0].parsed.x);
+                                    return date.toLocaleString('uk-UA', {{
+                                        timeZone: 'Europe/Kiev',
+                                        year: 'numeric',
+                                        month: '2-digit',
+                                        day: '2-digit',
+                                        hour: '2-digit',
+                                        minute: '2-digit',
+                                        second: '2-digit'
+                                    }});
+                                }},
+                                label: function(context) {{
+                                    return context.dataset.label + ': ' + context.parsed.y.toFixed(2);
+                                }}
+                            }}
                         }}
                     }},
-                    y: {{
-                        title: {{
-                            display: true,
-                            text: 'Значення',
-                            font: {{ size: 14, weight: 'bold' }}
-                        }},
-                        ticks: {{
-                            precision: 1,
-                            stepSize: 0.5,
-                            maxTicksLimit: 12
+                    scales: {{
+                        x: {{
+                            type: 'time',
+                            time: {{
+                                unit: 'hour',
+                                displayFormats: {{
+                                    hour: 'HH:mm',
+                                    day: 'dd.MM'
+                                }},
+                                tooltipFormat: 'dd.MM.yyyy HH:mm:ss'
+                            }},
+                            title: {{
+                                display: true,
+                                text: 'Час',
+                                font: {{ size: 14, weight: 'bold' }}
+                            }},
+                            ticks: {{
+                                maxRotation: 45,
+                                minRotation: 45,
+                                autoSkip: true,
+                                maxTicksLimit: 16
+                            }},
+                            grid: {{
+                                color: 'rgba(0,0,0,0.12)'
+                            }}
                         }},
-                        grid: {{
-                            color: 'rgba(0,0,0,0.12)'
+                        y: {{
+                            title: {{
+                                display: true,
+                                text: 'Значення',
+                                font: {{ size: 14, weight: 'bold' }}
+                            }},
+                            ticks: {{
+                                precision: 1,
+                                stepSize: 0.5,
+                                maxTicksLimit: 12
+                            }},
+                            grid: {{
+                                color: 'rgba(0,0,0,0.12)'
+                            }}
                         }}
                     }}
                 }}
-            }}
-        }});
-
-        const legendDiv = document.getElementById('legend');
-        datasets.forEach(dataset => {{
-            const item = document.createElement('div');
-            item.className = 'legend-item';
-            item.innerHTML = `
-                <div class="legend-color" style="background-color: ${{dataset.borderColor}}"></div>
-                <span><strong>${{dataset.label}}</strong> (${{dataset.data.length}} точок)</span>
-            `;
-            legendDiv.appendChild(item);
-        }});
+            }});
+
+            const legendDiv = document.getElementById('legend');
+            datasets.forEach(dataset => {{
+                const item = document.createElement('div');
+                item.className = 'legend-item';
+                item.innerHTML = `
+                    <div class="legend-color" style="background-color: ${{dataset.borderColor}}"></div>
+                    <span><strong>${{dataset.label}}</strong> (${{dataset.data.length}} точок)</span>
+                `;
+                legendDiv.appendChild(item);
+            }});
+        }}
     </script>
 </body>
 </html>
 """
-    return html
\ No newline at end of file
+    return html
+
+
+CHART_HTML = generate_chart_html()
+CHART_ETAG = '"' + hashlib.sha1(CHART_HTML.encode("utf-8")).hexdigest() + '"'
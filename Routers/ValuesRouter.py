@@ -3,12 +3,13 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-import json
 
 from DataBase.database import get_session
 from DataBase.models import Values, Devices  # SQLAlchemy-модель
 from DataBase.schemas import ValueCreate, ValueRead, ValueDelete, ValueUpdate
-from Routers.crud import create_unit, get_all_units, get_one_unit, update_unit, delete_unit
+from ActualDataForUser.BinaryProtocol import tag_ids
+from Routers.rollups import mark_covered
+from Routers.crud import get_all_units, get_one_unit, update_unit, delete_unit, get_value_settings
 
 values_router = APIRouter(prefix="/values", tags=["Values"])
 
@@ -16,7 +17,20 @@ values_router = APIRouter(prefix="/values", tags=["Values"])
 # CREATE
 @values_router.post("/create", response_model=ValueRead)
 async def create_value(value: ValueCreate, session: AsyncSession = Depends(get_session)):
-    return await create_unit(value, Values, session)
+    # Рядок Values і його покриття rollup-ами - в одній транзакції
+    unit = Values(**value.dict())
+    session.add(unit)
+    try:
+        await session.flush()
+        mark_covered(unit.id, session)
+        await session.commit()
+    except Exception:
+        await session.rollback()
+        raise
+    await session.refresh(unit)
+    # Новий тег одразу доступний бінарним продюсерам за його id
+    tag_ids.add(unit.id, unit.tag)
+    return unit
 
 
 @values_router.get("/get_all", response_model=list[ValueRead])
@@ -36,15 +50,8 @@ async def get_logging_values(session: AsyncSession = Depends(get_session)):
     logging_values = []
     for value in all_values:
         try:
-            # settings це вже dict (SQLAlchemy автоматично парсить JSON)
-            if value.settings and isinstance(value.settings, dict):
-                if value.settings.get('isLoging') == True:
-                    logging_values.append(value)
-            # Якщо settings це string - парсимо вручну
-            elif value.settings and isinstance(value.settings, str):
-                settings_dict = json.loads(value.settings)
-                if settings_dict.get('isLoging') == True:
-                    logging_values.append(value)
+            if get_value_settings(value.settings).get('isLoging') == True:
+                logging_values.append(value)
         except Exception as e:
             print(f"Error parsing settings for value {value.id}: {e}")
             continue
@@ -68,15 +75,19 @@ async def get_by_parent_id(parent_id: int, session: AsyncSession = Depends(get_s
 @values_router.put("/update/{val_id}", response_model=ValueRead)
 async def update_value(val_id: int, val_update: ValueUpdate, session: AsyncSession = Depends(get_session)):
     try:
-        return await update_unit(Values, val_id, val_update, session)
+        unit = await update_unit(Values, val_id, val_update, session)
     except HTTPException:
         raise HTTPException(status_code=404, detail="Value not found")
+    tag_ids.add(unit.id, unit.tag)
+    return unit
 
 
 # DELETE
 @values_router.delete("/delete/{val_id}")
 async def delete_value(val_id: int, session: AsyncSession = Depends(get_session)):
     try:
-        return await delete_unit(Values, val_id, session)
+        result = await delete_unit(Values, val_id, session)
     except HTTPException:
-        raise HTTPException(status_code=404, detail="Value not found")
\ No newline at end of file
+        raise HTTPException(status_code=404, detail="Value not found")
+    tag_ids.forget(val_id)
+    return result
\ No newline at end of file
@@ -0,0 +1,112 @@
+#arrow_export.py
+# Колонковий експорт вимірів у Parquet / Arrow IPC. pyarrow - опційна залежність:
+# без неї решта API працює, а експорт повертає помилку.
+import asyncio
+from typing import List, Optional
+
+from sqlalchemy.future import select
+
+from DataBase.database import AsyncSessionLocal
+from DataBase.models import Values
+from Routers.measures_query import iter_measures
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+ARROW_FORMATS = {
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "arrow": ("application/vnd.apache.arrow.file", "arrow"),
+}
+
+# Розмір row group = розмір частини, що читається з курсора
+ROW_GROUP_SIZE = 100_000
+
+
+def arrow_available() -> bool:
+    return pa is not None
+
+
+def measures_schema():
+    return pa.schema([
+        ("valueId", pa.int32()),
+        ("name", pa.dictionary(pa.int32(), pa.string())),
+        ("measureTime", pa.int64()),
+        ("measureValue", pa.float64()),
+    ])
+
+
+class MeasuresFileWriter:
+    # Синхронна частина експорту; усі методи викликаються через asyncio.to_thread по черзі
+    def __init__(self, path: str, names: list, format: str):
+        self.dictionary = pa.array([name for _, name in names], type=pa.string())
+        self.name_index = {value_id: i for i, (value_id, _) in enumerate(names)}
+        self.schema = measures_schema()
+        self.sink = None
+        if format == "parquet":
+            self.writer = pq.ParquetWriter(path, self.schema, compression="zstd")
+        else:
+            self.sink = pa.OSFile(path, "wb")
+            self.writer = pa.ipc.new_file(self.sink, self.schema)
+
+    def write(self, partition) -> None:
+        value_ids = [r[1] for r in partition]
+        batch = pa.record_batch([
+            pa.array(value_ids, type=pa.int32()),
+            pa.DictionaryArray.from_arrays(
+                pa.array([self.name_index.get(v) for v in value_ids], type=pa.int32()), self.dictionary
+            ),
+            pa.array([r[3] for r in partition], type=pa.int64()),
+            pa.array([float(r[2]) for r in partition], type=pa.float64()),
+        ], schema=self.schema)
+        if self.sink is None:
+            self.writer.write_batch(batch, row_group_size=ROW_GROUP_SIZE)
+        else:
+            self.writer.write_batch(batch)
+
+    def close(self) -> None:
+        self.writer.close()
+        if self.sink is not None:
+            self.sink.close()
+
+
+async def write_measures_file(path: str, ids: Optional[List[int]], start_time: Optional[int],
+                              end_time: Optional[int], format: str = "parquet") -> int:
+    """
+    Пише виміри у файл path по row group на кожну частину з серверного курсора.
+    Назви значень з Values кодуються словником. Повертає кількість рядків.
+    """
+    if pa is None:
+        raise RuntimeError("pyarrow is not installed")
+
+    async with AsyncSessionLocal() as session:
+        query = select(Values.id, Values.name)
+        if ids:
+            query = query.where(Values.id.in_(ids))
+        result = await session.execute(query)
+        names = result.all()
+
+    # Побудова batch-ів, стиснення і запис на диск - в окремому потоці, щоб не блокувати event loop;
+    # поки потік пише одну частину, з курсора вже читається наступна
+    writer = await asyncio.to_thread(MeasuresFileWriter, path, names, format)
+    rows = 0
+    pending: Optional[asyncio.Future] = None
+    try:
+        async for partition in iter_measures(ids, start_time, end_time, ROW_GROUP_SIZE):
+            if pending is not None:
+                await pending
+            pending = asyncio.ensure_future(asyncio.to_thread(writer.write, partition))
+            rows += len(partition)
+        if pending is not None:
+            await pending
+            pending = None
+    finally:
+        if pending is not None:
+            # Помилка читання: дочекатися запису, перш ніж закривати файл
+            await asyncio.gather(pending, return_exceptions=True)
+        await asyncio.to_thread(writer.close)
+    return rows
+
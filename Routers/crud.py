@@ -1,7 +1,9 @@
 #crud.py
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
+from sqlalchemy import insert
 from fastapi import HTTPException
+import json
 
 async def create_unit(pydentic_model, orm_model, session: AsyncSession):
     new_unit = orm_model(**pydentic_model.dict())
@@ -10,6 +12,22 @@ async def create_unit(pydentic_model, orm_model, session: AsyncSession):
     await session.refresh(new_unit)
     return new_unit
 
+async def create_many_units(rows: list[dict], orm_model, session: AsyncSession, chunk_size: int = 1000,
+                            commit: bool = True) -> int:
+    # Багаторядкові INSERT по chunk_size рядків в одній транзакції, без refresh кожного рядка
+    inserted = 0
+    try:
+        for start in range(0, len(rows), chunk_size):
+            chunk = rows[start:start + chunk_size]
+            await session.execute(insert(orm_model).values(chunk))
+            inserted += len(chunk)
+        if commit:
+            await session.commit()
+    except Exception:
+        await session.rollback()
+        raise
+    return inserted
+
 async def get_all_units(orm_model, session: AsyncSession):
     result = await session.execute(select(orm_model))
     return result.scalars().all()
@@ -41,4 +59,12 @@ async def delete_unit(orm_model, unit_id, session: AsyncSession):
         raise HTTPException(status_code=404)
     await session.delete(unit)
     await session.commit()
-    return {"ok": True}
\ No newline at end of file
+    return {"ok": True}
+
+def get_value_settings(settings) -> dict:
+    # settings зазвичай вже dict (SQLAlchemy парсить JSON), але старі записи можуть бути рядком
+    if settings and isinstance(settings, dict):
+        return settings
+    if settings and isinstance(settings, str):
+        return json.loads(settings)
+    return {}
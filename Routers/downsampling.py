@@ -0,0 +1,86 @@
+#downsampling.py
+from typing import List, Tuple
+
+
+def lttb(xs: List[float], ys: List[float], max_points: int) -> Tuple[List[float], List[float]]:
+    """
+    Largest-Triangle-Three-Buckets: залишає max_points точок, які найкраще зберігають форму лінії.
+    """
+    n = len(xs)
+    if max_points >= n or max_points < 3:
+        return xs, ys
+
+    out_x = [xs[0]]
+    out_y = [ys[0]]
+    bucket_size = (n - 2) / (max_points - 2)
+    a = 0
+
+    for i in range(max_points - 2):
+        # Середня точка наступного кошика
+        next_start = int((i + 1) * bucket_size) + 1
+        next_end = min(int((i + 2) * bucket_size) + 1, n)
+        next_len = next_end - next_start
+        avg_x = sum(xs[next_start:next_end]) / next_len
+        avg_y = sum(ys[next_start:next_end]) / next_len
+
+        # Точка поточного кошика з найбільшою площею трикутника
+        start = int(i * bucket_size) + 1
+        end = int((i + 1) * bucket_size) + 1
+        ax, ay = xs[a], ys[a]
+        max_area = -1.0
+        chosen = start
+        for j in range(start, end):
+            area = abs((ax - avg_x) * (ys[j] - ay) - (ax - xs[j]) * (avg_y - ay))
+            if area > max_area:
+                max_area = area
+                chosen = j
+
+        out_x.append(xs[chosen])
+        out_y.append(ys[chosen])
+        a = chosen
+
+    out_x.append(xs[-1])
+    out_y.append(ys[-1])
+    return out_x, out_y
+
+
+def min_max_buckets(xs: List[float], ys: List[float], max_points: int) -> Tuple[List[float], List[float]]:
+    """
+    Ділить ряд на max_points / 2 кошиків і залишає в кожному мінімум і максимум (у порядку часу),
+    тому жоден пік не губиться.
+    """
+    n = len(xs)
+    if max_points >= n or max_points < 2:
+        return xs, ys
+
+    buckets = max_points // 2
+    bucket_size = n / buckets
+    out_x = []
+    out_y = []
+
+    for i in range(buckets):
+        start = int(i * bucket_size)
+        end = min(int((i + 1) * bucket_size), n)
+        if start >= end:
+            continue
+        i_min = i_max = start
+        for j in range(start + 1, end):
+            if ys[j] < ys[i_min]:
+                i_min = j
+            elif ys[j] > ys[i_max]:
+                i_max = j
+        for j in sorted({i_min, i_max}):
+            out_x.append(xs[j])
+            out_y.append(ys[j])
+
+    return out_x, out_y
+
+
+DOWNSAMPLING_METHODS = {
+    "lttb": lttb,
+    "minmax": min_max_buckets,
+}
+
+
+def downsample(xs: List[float], ys: List[float], max_points: int, method: str = "minmax") -> Tuple[List[float], List[float]]:
+    return DOWNSAMPLING_METHODS[method](xs, ys, max_points)
@@ -0,0 +1,286 @@
+#measures_query.py
+import asyncio
+import heapq
+import os
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy import and_, or_, func
+
+import settings
+from DataBase.archive import iter_archive_days, read_archive
+from DataBase.database import AsyncSessionLocal
+from DataBase.models import Measures, Values
+from Routers.crud import create_many_units
+from Routers.rollups import ROLLUP_MODELS, update_rollups, rollups_cover
+
+# Скільки рядків забирати з курсора за раз
+FETCH_PARTITION_SIZE = 10000
+# Каталог архіву retention (None - архів вимкнено)
+ARCHIVE_DIR = getattr(settings, "archiveDir", None)
+
+
+async def read_archived(value_id: int, start_time: Optional[int], end_time: Optional[int],
+                        after: Optional[Tuple[int, int]] = None,
+                        limit: Optional[int] = None) -> List[Tuple[int, int, float]]:
+    # (id, measureTime, measureValue) з архівних файлів; читання з диска - в окремому потоці
+    if not ARCHIVE_DIR:
+        return []
+    return await asyncio.to_thread(read_archive, ARCHIVE_DIR, value_id, start_time, end_time, after, limit)
+
+
+async def iter_archived(value_id: int, start_time: Optional[int],
+                        end_time: Optional[int]) -> AsyncIterator[List[Tuple[int, int, float]]]:
+    # Те саме, але по одному денному файлу - у пам'яті не більше доби архіву одного ряду
+    days = iter_archive_days(ARCHIVE_DIR, value_id, start_time, end_time)
+    while True:
+        day_rows = await asyncio.to_thread(next, days, None)
+        if day_rows is None:
+            return
+        yield day_rows
+
+
+async def drop_present_in_db(archived: List[Tuple[int, int, float]], session: AsyncSession,
+                             chunk_size: int = 5000) -> List[Tuple[int, int, float]]:
+    # Рядки, які заархівували, але DELETE не пройшов, лишились і в measures - беремо їх лише з БД
+    present = set()
+    for start in range(0, len(archived), chunk_size):
+        chunk_ids = [r[0] for r in archived[start:start + chunk_size]]
+        result = await session.execute(select(Measures.id).where(Measures.id.in_(chunk_ids)))
+        present.update(result.scalars().all())
+    return [r for r in archived if r[0] not in present] if present else archived
+
+
+async def insert_measures(rows: List[dict], session: AsyncSession, chunk_size: int = 1000) -> int:
+    # Сирі рядки і rollup-агрегати пишуться в одній транзакції
+    try:
+        inserted = await create_many_units(rows, Measures, session, chunk_size, commit=False)
+        await update_rollups(rows, session)
+        await session.commit()
+    except Exception:
+        await session.rollback()
+        raise
+    return inserted
+
+
+def parse_value_ids(value_ids: str) -> List[int]:
+    return [int(id.strip()) for id in value_ids.split(',') if id.strip()]
+
+
+async def get_values_meta(ids: List[int], session: AsyncSession) -> Dict[int, Tuple[str, str | None]]:
+    # Один запит на метадані всіх рядів: id -> (name, tag)
+    result = await session.execute(select(Values.id, Values.name, Values.tag).where(Values.id.in_(ids)))
+    return {value_id: (name, tag) for value_id, name, tag in result.all()}
+
+
+async def fetch_series(ids: List[int], start_time: int, end_time: int,
+                       session: AsyncSession) -> Dict[int, Tuple[List[int], List[float]]]:
+    """
+    Завантажує виміри всіх рядів одним запитом IN (...) і розкладає їх по valueId за один прохід.
+    Вибираються лише колонки (без ORM-об'єктів), рядки читаються з серверного курсора частинами.
+    Повертає valueId -> (measureTime[], measureValue[]).
+    """
+    series: Dict[int, Tuple[List[int], List[float]]] = {}
+    if not ids:
+        return series
+
+    result = await session.stream(
+        select(Measures.valueId, Measures.measureTime, Measures.measureValue)
+        .where(
+            and_(
+                Measures.valueId.in_(ids),
+                Measures.measureTime >= start_time,
+                Measures.measureTime <= end_time
+            )
+        )
+        .order_by(Measures.valueId, Measures.measureTime)
+    )
+
+    current_id = None
+    times: List[int] = []
+    values: List[float] = []
+    async for partition in result.partitions(FETCH_PARTITION_SIZE):
+        for value_id, measure_time, measure_value in partition:
+            if value_id != current_id:
+                current_id = value_id
+                times, values = series.setdefault(value_id, ([], []))
+            times.append(measure_time)
+            values.append(measure_value)
+
+    # Дані, що пішли в архів за retention, додаються до рядів прозоро
+    for value_id in ids:
+        archived = await read_archived(value_id, start_time, end_time)
+        if archived:
+            archived = await drop_present_in_db(archived, session)
+        if not archived:
+            continue
+        times, values = series.get(value_id, ([], []))
+        merged = list(heapq.merge(((r[1], r[2]) for r in archived), zip(times, values), key=lambda p: p[0]))
+        series[value_id] = ([p[0] for p in merged], [p[1] for p in merged])
+
+    return series
+
+
+def encode_cursor(measure_time: int, measure_id: int) -> str:
+    return f"{measure_time}:{measure_id}"
+
+
+def decode_cursor(cursor: str) -> Tuple[int, int]:
+    measure_time, measure_id = cursor.split(":")
+    return int(measure_time), int(measure_id)
+
+
+async def fetch_page(value_id: int, session: AsyncSession, start_time: Optional[int] = None,
+                     end_time: Optional[int] = None, limit: int = 10000,
+                     cursor: Optional[str] = None) -> Tuple[List[dict], Optional[str]]:
+    """
+    Одна сторінка вимірів value_id у порядку (measureTime, id) з keyset-пагінацією.
+    Повертає рядки і курсор наступної сторінки (None, якщо це остання).
+    """
+    conditions = [Measures.valueId == value_id]
+    if start_time is not None:
+        conditions.append(Measures.measureTime >= start_time)
+    if end_time is not None:
+        conditions.append(Measures.measureTime <= end_time)
+    if cursor:
+        after_time, after_id = decode_cursor(cursor)
+        conditions.append(or_(
+            Measures.measureTime > after_time,
+            and_(Measures.measureTime == after_time, Measures.id > after_id)
+        ))
+
+    # limit + 1, щоб дізнатись, чи є наступна сторінка, без окремого COUNT
+    result = await session.execute(
+        select(Measures.id, Measures.valueId, Measures.measureValue, Measures.measureTime)
+        .where(and_(*conditions))
+        .order_by(Measures.measureTime, Measures.id)
+        .limit(limit + 1)
+    )
+    rows = [dict(row) for row in result.mappings().all()]
+
+    # З архіву - лише від курсора і не більше limit + 1 рядків
+    archived = await read_archived(value_id, start_time, end_time,
+                                   (after_time, after_id) if cursor else None, limit + 1)
+    if archived:
+        archived = await drop_present_in_db(archived, session)
+    if archived:
+        archived_rows = [
+            {"id": r[0], "valueId": value_id, "measureValue": r[2], "measureTime": r[1]}
+            for r in archived
+        ]
+        rows = list(heapq.merge(archived_rows, rows, key=lambda r: (r["measureTime"], r["id"])))[:limit + 1]
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]["measureTime"], rows[-1]["id"])
+    return rows, next_cursor
+
+
+async def iter_measures(ids: Optional[List[int]], start_time: Optional[int], end_time: Optional[int],
+                        partition_size: int = FETCH_PARTITION_SIZE) -> AsyncIterator[List[tuple]]:
+    """
+    Видає виміри частинами (id, valueId, measureValue, measureTime) з серверного курсора.
+    Відкриває власну сесію, бо живе довше за запит (StreamingResponse).
+    """
+    conditions = []
+    if ids:
+        conditions.append(Measures.valueId.in_(ids))
+    if start_time is not None:
+        conditions.append(Measures.measureTime >= start_time)
+    if end_time is not None:
+        conditions.append(Measures.measureTime <= end_time)
+
+    async with AsyncSessionLocal() as session:
+        # Спершу архівні рядки (вони старші за retention), потім - з БД; архів читається по добі
+        if ARCHIVE_DIR:
+            archived_ids = ids
+            if not archived_ids and os.path.isdir(ARCHIVE_DIR):
+                archived_ids = sorted(int(name) for name in os.listdir(ARCHIVE_DIR) if name.isdigit())
+            for value_id in archived_ids or []:
+                async for archived in iter_archived(value_id, start_time, end_time):
+                    archived = await drop_present_in_db(archived, session)
+                    for start in range(0, len(archived), partition_size):
+                        yield [(r[0], value_id, r[2], r[1]) for r in archived[start:start + partition_size]]
+
+        result = await session.stream(
+            select(Measures.id, Measures.valueId, Measures.measureValue, Measures.measureTime)
+            .where(*conditions)
+            .order_by(Measures.valueId, Measures.measureTime)
+            .execution_options(yield_per=partition_size)
+        )
+        async for partition in result.partitions(partition_size):
+            yield partition
+
+
+AGGREGATE_FUNCTIONS = ("avg", "min", "max", "count", "sum")
+
+
+def choose_aggregate_source(start_time: int, end_time: int, bucket: int):
+    """
+    Найгрубша rollup-таблиця, з якої можна точно зібрати кошики розміром bucket
+    (bucket кратний її роздільності, start_time - початок її кошика, end_time - остання секунда кошика,
+    бо сирий запит включає end_time). None - рахуємо по сирих даних.
+    """
+    chosen = None
+    for model in ROLLUP_MODELS:
+        res = model.resolution
+        if bucket % res == 0 and start_time % res == 0 and (end_time + 1) % res == 0:
+            chosen = model
+    return chosen
+
+
+async def aggregate_series(ids: List[int], start_time: int, end_time: int, bucket: int,
+                           functions: List[str], session: AsyncSession) -> Tuple[str, Dict[int, Dict[str, list]]]:
+    """
+    GROUP BY valueId, кошик часу - в БД (по rollup-таблиці, якщо вона підходить).
+    Повертає джерело ("raw" або таблиця) і valueId -> {"t": [...], "<fn>": [...]}.
+    """
+    model = choose_aggregate_source(start_time, end_time, bucket)
+    if model is not None and not await rollups_cover(ids, start_time, session):
+        # Старі виміри ще не перенесені в rollup-и (backfill_rollups не запускали)
+        model = None
+    if model is None:
+        source = Measures.__tablename__
+        bucket_time = (Measures.measureTime - func.mod(Measures.measureTime, bucket)).label("t")
+        columns = {
+            "avg": func.avg(Measures.measureValue),
+            "min": func.min(Measures.measureValue),
+            "max": func.max(Measures.measureValue),
+            "count": func.count(Measures.id),
+            "sum": func.sum(Measures.measureValue),
+        }
+        value_column = Measures.valueId
+        conditions = [Measures.valueId.in_(ids), Measures.measureTime >= start_time, Measures.measureTime <= end_time]
+    else:
+        source = model.__tablename__
+        bucket_time = (model.bucketTime - func.mod(model.bucketTime, bucket)).label("t")
+        columns = {
+            "avg": func.sum(model.sumValue) / func.sum(model.count),
+            "min": func.min(model.minValue),
+            "max": func.max(model.maxValue),
+            "count": func.sum(model.count),
+            "sum": func.sum(model.sumValue),
+        }
+        value_column = model.valueId
+        # Ті самі межі, що й для сирих даних: кошики цілком у [start_time, end_time]
+        conditions = [model.valueId.in_(ids), model.bucketTime >= start_time, model.bucketTime <= end_time]
+
+    result = await session.execute(
+        select(value_column, bucket_time, *(columns[fn].label(fn) for fn in functions))
+        .where(and_(*conditions))
+        .group_by(value_column, bucket_time)
+        .order_by(value_column, bucket_time)
+    )
+
+    series: Dict[int, Dict[str, list]] = {}
+    for row in result.all():
+        columns_for_value = series.get(row[0])
+        if columns_for_value is None:
+            columns_for_value = series[row[0]] = {"t": [], **{fn: [] for fn in functions}}
+        columns_for_value["t"].append(int(row[1]))
+        for fn, value in zip(functions, row[2:]):
+            columns_for_value[fn].append(int(value) if fn == "count" else float(value))
+
+    return source, series
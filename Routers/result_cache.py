@@ -0,0 +1,95 @@
+#result_cache.py
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+
+class ResultCache:
+    """
+    LRU-кеш готових відповідей (серіалізованих байтів) з лімітом пам'яті і TTL.
+    Одночасні однакові запити чекають на одне обчислення (single-flight); обчислення
+    йде окремою задачею, тож скасування запиту, що його почав, не зачіпає решту.
+    compute не повинен залежати від ресурсів запиту (сесії з Depends тощо).
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, live_ttl: float = 5.0):
+        self.max_bytes = max_bytes
+        self.live_ttl = live_ttl
+        self.entries: "OrderedDict[Hashable, Tuple[bytes, Optional[float]]]" = OrderedDict()
+        self.size = 0
+        self.in_flight: Dict[Hashable, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def ttl_for_range(self, end_time: int) -> Optional[float]:
+        # Проміжок повністю в минулому не зміниться - зберігаємо без TTL; якщо він включає "зараз" - коротко
+        return self.live_ttl if end_time >= time.time() - self.live_ttl else None
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        body, expires_at = entry
+        if expires_at is not None and expires_at < time.monotonic():
+            self._remove(key)
+            return None
+        self.entries.move_to_end(key)
+        return body
+
+    def put(self, key: Hashable, body: bytes, ttl: Optional[float]) -> None:
+        if len(body) > self.max_bytes:
+            return
+        if key in self.entries:
+            self._remove(key)
+        self.entries[key] = (body, time.monotonic() + ttl if ttl is not None else None)
+        self.size += len(body)
+        while self.size > self.max_bytes:
+            self._remove(next(iter(self.entries)))
+
+    async def get_or_compute(self, key: Hashable, ttl: Optional[float],
+                             compute: Callable[[], Awaitable[bytes]]) -> bytes:
+        body = self.get(key)
+        if body is not None:
+            self.hits += 1
+            return body
+
+        pending = self.in_flight.get(key)
+        if pending is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            pending = self.in_flight[key] = asyncio.create_task(self._compute(key, ttl, compute))
+            pending.add_done_callback(self._retrieve_exception)
+        return await asyncio.shield(pending)
+
+    async def _compute(self, key: Hashable, ttl: Optional[float],
+                       compute: Callable[[], Awaitable[bytes]]) -> bytes:
+        try:
+            body = await compute()
+            self.put(key, body, ttl)
+            return body
+        finally:
+            del self.in_flight[key]
+
+    @staticmethod
+    def _retrieve_exception(task: asyncio.Task) -> None:
+        # Щоб не було "Task exception was never retrieved", якщо всі, хто чекав, уже пішли
+        if not task.cancelled():
+            task.exception()
+
+    def get_stats(self) -> dict:
+        return {
+            "entries": len(self.entries),
+            "bytes": self.size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "in_flight": len(self.in_flight)
+        }
+
+    def _remove(self, key: Hashable) -> None:
+        body, _ = self.entries.pop(key)
+        self.size -= len(body)
@@ -0,0 +1,121 @@
+#retention.py
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy import and_, delete
+
+from DataBase.archive import archive_rows
+from DataBase.database import AsyncSessionLocal
+from DataBase.models import Measures, Values
+from Routers.crud import get_value_settings
+
+DAY = 86400
+
+
+async def get_retention_days(session: AsyncSession, value_ids: Optional[Iterable[int]] = None) -> Dict[int, int]:
+    # valueId -> retentionDays для всіх Values (або лише value_ids), де в settings задано retentionDays > 0
+    query = select(Values.id, Values.settings)
+    if value_ids is not None:
+        query = query.where(Values.id.in_(list(value_ids)))
+    result = await session.execute(query)
+    retention = {}
+    for value_id, settings in result.all():
+        try:
+            days = get_value_settings(settings).get('retentionDays')
+            if days and int(days) > 0:
+                retention[value_id] = int(days)
+        except Exception as e:
+            print(f"Error parsing settings for value {value_id}: {e}")
+    return retention
+
+
+async def purge_value(session: AsyncSession, value_id: int, cutoff: int, archive_dir: Optional[str] = None,
+                      chunk_size: int = 5000, pause: float = 0.05) -> int:
+    """
+    Видаляє виміри value_id, старші за cutoff, невеликими частинами в порядку первинного ключа.
+    Кожна частина - окрема коротка транзакція, тож таблиця не блокується надовго.
+    Якщо задано archive_dir, частина спершу дописується в архів.
+    """
+    purged = 0
+    while True:
+        result = await session.execute(
+            select(Measures.id, Measures.valueId, Measures.measureTime, Measures.measureValue)
+            .where(and_(Measures.valueId == value_id, Measures.measureTime < cutoff))
+            .order_by(Measures.id)
+            .limit(chunk_size)
+        )
+        rows = result.all()
+        if not rows:
+            break
+
+        if archive_dir:
+            # Файл пишеться до DELETE: після збою рядки просто заархівуються ще раз
+            await asyncio.to_thread(archive_rows, archive_dir, rows)
+
+        await session.execute(delete(Measures).where(Measures.id.in_([r[0] for r in rows])))
+        await session.commit()
+        purged += len(rows)
+
+        if len(rows) < chunk_size:
+            break
+        await asyncio.sleep(pause)
+    return purged
+
+
+@dataclass
+class RetentionStats:
+    runs: int = 0
+    purged: int = 0
+    last_run_time: float = 0.0
+    last_error: str | None = None
+
+
+class RetentionJob:
+    """
+    Фонова задача, яка раз на interval секунд застосовує retentionDays з Values.settings.
+    """
+
+    def __init__(self, interval: float = 3600.0, archive_dir: Optional[str] = None, chunk_size: int = 5000):
+        self.interval = interval
+        self.archive_dir = archive_dir
+        self.chunk_size = chunk_size
+        self.stats = RetentionStats()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+
+    async def run_once(self) -> int:
+        purged = 0
+        now = int(time.time())
+        async with AsyncSessionLocal() as session:
+            retention = await get_retention_days(session)
+            await session.commit()
+            for value_id, days in retention.items():
+                purged += await purge_value(session, value_id, now - days * DAY, self.archive_dir, self.chunk_size)
+        self.stats.runs += 1
+        self.stats.purged += purged
+        self.stats.last_run_time = time.time()
+        return purged
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                await self.run_once()
+                self.stats.last_error = None
+            except Exception as e:
+                self.stats.last_error = str(e)
+                print(f"Retention run failed: {e}")
+            await asyncio.sleep(self.interval)
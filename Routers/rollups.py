@@ -0,0 +1,269 @@
+#rollups.py
+import asyncio
+import time
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy import and_, case, delete, func
+
+from DataBase.archive import read_archive
+from DataBase.models import Measures, MeasuresRollup1m, MeasuresRollup1h, MeasuresRollup1d, RollupCoverage
+from Routers.retention import DAY, get_retention_days
+import settings
+
+# Від найдрібнішої до найгрубішої
+ROLLUP_MODELS = [MeasuresRollup1m, MeasuresRollup1h, MeasuresRollup1d]
+ROLLUP_BY_NAME = {"1m": MeasuresRollup1m, "1h": MeasuresRollup1h, "1d": MeasuresRollup1d}
+
+UPSERT_CHUNK_SIZE = 1000
+# coveredFrom для рядів, rollup-и яких повні за весь час
+MIN_TIME = -2 ** 63
+# Каталог архіву retention (None - архів вимкнено)
+ARCHIVE_DIR = getattr(settings, "archiveDir", None)
+FETCH_PARTITION_SIZE = 10000
+BACKFILL_PARTITION_SIZE = 50000
+
+
+def aggregate_rows(rows: List[dict], resolution: int) -> List[dict]:
+    """
+    Згортає рядки measures у кошики (valueId, bucketTime) з min/max/sum/count/first/last.
+    """
+    buckets: Dict[Tuple[int, int], dict] = {}
+    for row in rows:
+        t = row["measureTime"]
+        v = row["measureValue"]
+        key = (row["valueId"], t - t % resolution)
+        b = buckets.get(key)
+        if b is None:
+            buckets[key] = {
+                "valueId": key[0], "bucketTime": key[1],
+                "minValue": v, "maxValue": v, "sumValue": v, "count": 1,
+                "firstTime": t, "firstValue": v, "lastTime": t, "lastValue": v
+            }
+            continue
+        if v < b["minValue"]:
+            b["minValue"] = v
+        if v > b["maxValue"]:
+            b["maxValue"] = v
+        b["sumValue"] += v
+        b["count"] += 1
+        if t < b["firstTime"]:
+            b["firstTime"], b["firstValue"] = t, v
+        if t >= b["lastTime"]:
+            b["lastTime"], b["lastValue"] = t, v
+    return list(buckets.values())
+
+
+async def upsert_rollup(model, buckets: List[dict], session: AsyncSession) -> None:
+    # Зливає нові кошики з існуючими через INSERT ... ON DUPLICATE KEY UPDATE.
+    # Порядок присвоєнь важливий: MySQL обчислює їх зліва направо, тому *Value йде перед *Time.
+    table = model.__table__
+    for start in range(0, len(buckets), UPSERT_CHUNK_SIZE):
+        stmt = mysql_insert(table).values(buckets[start:start + UPSERT_CHUNK_SIZE])
+        new = stmt.inserted
+        stmt = stmt.on_duplicate_key_update([
+            ("minValue", func.least(table.c.minValue, new.minValue)),
+            ("maxValue", func.greatest(table.c.maxValue, new.maxValue)),
+            ("sumValue", table.c.sumValue + new.sumValue),
+            ("count", table.c.count + new.count),
+            ("firstValue", case((new.firstTime < table.c.firstTime, new.firstValue), else_=table.c.firstValue)),
+            ("firstTime", func.least(table.c.firstTime, new.firstTime)),
+            ("lastValue", case((new.lastTime >= table.c.lastTime, new.lastValue), else_=table.c.lastValue)),
+            ("lastTime", func.greatest(table.c.lastTime, new.lastTime)),
+        ])
+        await session.execute(stmt)
+
+
+async def update_rollups(rows: List[dict], session: AsyncSession) -> None:
+    # Викликається в тій самій транзакції, що й вставка рядків measures
+    if not rows:
+        return
+    for model in ROLLUP_MODELS:
+        await upsert_rollup(model, aggregate_rows(rows, model.resolution), session)
+
+
+async def extend_coverage(value_id: int, start_time: Optional[int], end_time: Optional[int],
+                          session: AsyncSession) -> None:
+    # Після перерахунку [start_time, end_time] покриття ряду розширюється до start_time,
+    # якщо перерахований проміжок стикується з уже покритим (або йде до кінця)
+    covered_from = start_time if start_time is not None else MIN_TIME
+    coverage = await session.get(RollupCoverage, value_id)
+    if coverage is None:
+        if end_time is None:
+            session.add(RollupCoverage(valueId=value_id, coveredFrom=covered_from))
+    elif covered_from < coverage.coveredFrom and (end_time is None or end_time + 1 >= coverage.coveredFrom):
+        coverage.coveredFrom = covered_from
+
+
+def mark_covered(value_id: int, session: AsyncSession) -> None:
+    # Новий ряд: усі його виміри підуть через update_rollups, тож rollup-и повні з самого початку.
+    # Не комітить - рядок покриття пишеться в транзакції створення Values
+    session.add(RollupCoverage(valueId=value_id, coveredFrom=MIN_TIME))
+
+
+async def rollups_cover(ids: List[int], start_time: int, session: AsyncSession) -> bool:
+    # Чи можна брати агрегати всіх ids з rollup-таблиць від start_time
+    if not ids:
+        return True
+    result = await session.execute(
+        select(func.count()).select_from(RollupCoverage)
+        .where(and_(RollupCoverage.valueId.in_(ids), RollupCoverage.coveredFrom <= start_time))
+    )
+    return result.scalar() == len(set(ids))
+
+
+async def recompute_rollup_buckets(points: List[Tuple[int, int]], session: AsyncSession) -> None:
+    """
+    Перераховує з сирих measures кошики, що містять точки (valueId, measureTime) - після
+    видалення або зміни рядка min/max/first/last не можна скоригувати інкрементально.
+    Рядки, які retention вже переніс в архів, беруться з архіву (як у fetch_series);
+    без архіву кошики, старші за межу retention, не чіпаються - перерахунок з рядків, що лишились,
+    їх би зменшив. Не комітить: викликається в транзакції самої зміни, після flush.
+    """
+    day = MeasuresRollup1d.resolution
+    cutoffs: Dict[int, int] = {}
+    if not ARCHIVE_DIR:
+        now = int(time.time())
+        retention = await get_retention_days(session, {v for v, _ in points})
+        cutoffs = {value_id: now - days * DAY for value_id, days in retention.items()}
+
+    for value_id, day_start in {(v, t - t % day) for v, t in points}:
+        result = await session.execute(
+            select(Measures.id, Measures.measureTime, Measures.measureValue)
+            .where(and_(Measures.valueId == value_id,
+                        Measures.measureTime >= day_start,
+                        Measures.measureTime < day_start + day))
+        )
+        by_id = {measure_id: (t, v) for measure_id, t, v in result.all()}
+        if ARCHIVE_DIR:
+            archived = await asyncio.to_thread(read_archive, ARCHIVE_DIR, value_id, day_start, day_start + day - 1)
+            # Рядок може бути і в архіві, і в measures (DELETE після архівації не пройшов)
+            for measure_id, t, v in archived:
+                by_id.setdefault(measure_id, (t, v))
+        day_rows = [{"valueId": value_id, "measureTime": t, "measureValue": v} for t, v in by_id.values()]
+        cutoff = cutoffs.get(value_id)
+        for model in ROLLUP_MODELS:
+            res = model.resolution
+            bucket_times = {t - t % res for v, t in points if v == value_id and day_start <= t < day_start + day}
+            if cutoff is not None:
+                bucket_times = {b for b in bucket_times if b >= cutoff}
+            if not bucket_times:
+                continue
+            await session.execute(delete(model).where(and_(model.valueId == value_id,
+                                                           model.bucketTime.in_(bucket_times))))
+            buckets = [b for b in aggregate_rows(day_rows, res) if b["bucketTime"] in bucket_times]
+            if buckets:
+                await upsert_rollup(model, buckets, session)
+
+
+async def backfill_rollups(session: AsyncSession, value_ids: Optional[List[int]] = None,
+                           start_time: Optional[int] = None, end_time: Optional[int] = None) -> int:
+    """
+    Перераховує rollup-таблиці з сирих measures. Кошики на межах проміжку перераховуються
+    повністю, тому start/end вирівнюються до меж денного кошика.
+    Повертає кількість оброблених сирих рядків.
+    """
+    day = MeasuresRollup1d.resolution
+    if start_time is not None:
+        start_time -= start_time % day
+    if end_time is not None:
+        end_time = end_time - end_time % day + day - 1
+
+    if value_ids is None:
+        ids_result = await session.execute(select(Measures.valueId).distinct())
+        value_ids = list(ids_result.scalars().all())
+
+    processed = 0
+    for value_id in value_ids:
+        for model in ROLLUP_MODELS:
+            conditions = [model.valueId == value_id]
+            if start_time is not None:
+                conditions.append(model.bucketTime >= start_time)
+            if end_time is not None:
+                conditions.append(model.bucketTime <= end_time)
+            await session.execute(delete(model).where(and_(*conditions)))
+
+        conditions = [Measures.valueId == value_id]
+        if start_time is not None:
+            conditions.append(Measures.measureTime >= start_time)
+        if end_time is not None:
+            conditions.append(Measures.measureTime <= end_time)
+
+        # Серверний курсор тут не підходить: на тому ж з'єднанні виконуються upsert-и,
+        # тому читаємо частинами по первинному ключу
+        last_id = 0
+        while True:
+            result = await session.execute(
+                select(Measures.id, Measures.measureTime, Measures.measureValue)
+                .where(and_(Measures.id > last_id, *conditions))
+                .order_by(Measures.id)
+                .limit(BACKFILL_PARTITION_SIZE)
+            )
+            partition = result.all()
+            if not partition:
+                break
+            last_id = partition[-1][0]
+            rows = [{"valueId": value_id, "measureTime": r[1], "measureValue": r[2]} for r in partition]
+            await update_rollups(rows, session)
+            processed += len(rows)
+
+        await extend_coverage(value_id, start_time, end_time, session)
+        # Коміт після кожного value, щоб транзакція не розросталась
+        await session.commit()
+
+    return processed
+
+
+def choose_rollup(start_time: int, end_time: int, max_points: int):
+    """
+    Найгрубша роздільність, у якій на проміжок ще припадає не менше max_points кошиків.
+    None - проміжок короткий, потрібні сирі дані.
+    """
+    chosen = None
+    span = end_time - start_time
+    for model in ROLLUP_MODELS:
+        if span // model.resolution >= max_points:
+            chosen = model
+    return chosen
+
+
+async def fetch_rollup_series(model, ids: List[int], start_time: int, end_time: int,
+                              session: AsyncSession) -> Dict[int, Tuple[List[int], List[float]]]:
+    """
+    Те саме, що fetch_series, але з rollup-таблиці: кожен кошик дає дві точки (min і max)
+    у момент bucketTime, тож піки зберігаються.
+    """
+    series: Dict[int, Tuple[List[int], List[float]]] = {}
+    if not ids:
+        return series
+
+    result = await session.stream(
+        select(model.valueId, model.bucketTime, model.minValue, model.maxValue)
+        .where(
+            and_(
+                model.valueId.in_(ids),
+                # Кошик, що почався до start_time, містить дані поза проміжком - з першого повного
+                model.bucketTime >= start_time,
+                model.bucketTime <= end_time
+            )
+        )
+        .order_by(model.valueId, model.bucketTime)
+    )
+
+    current_id = None
+    times: List[int] = []
+    values: List[float] = []
+    async for partition in result.partitions(FETCH_PARTITION_SIZE):
+        for value_id, bucket_time, min_value, max_value in partition:
+            if value_id != current_id:
+                current_id = value_id
+                times, values = series.setdefault(value_id, ([], []))
+            times.append(bucket_time)
+            values.append(min_value)
+            if max_value != min_value:
+                times.append(bucket_time)
+                values.append(max_value)
+
+    return series
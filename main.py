@@ -10,12 +10,20 @@ from Routers.DeviceRouter import devices_router
 from Routers.NodeRouters import nodes_router
 from Routers.ValuesRouter import values_router
 from Routers.DecodingTypeRouter import decoding_type_router
-from Routers.ActualDataRouters import actual_data_router
-from Routers.EventsRouter import events_router
-from Routers.MeasuresRouter import measures_router
+from Routers.ActualDataRouters import actual_data_router, measures_writer, worker_bus as values_bus, value_vault
+from Routers.EventsRouter import events_router, worker_bus as events_bus, value_vault as events_vault
+from Routers.MeasuresRouter import measures_router, retention_job
+from ActualDataForUser.StateSnapshot import StateSnapshotter, seed_values_from_measures
+from ActualDataForUser.BinaryProtocol import tag_ids
+import settings
 
 app = FastAPI()
 
+# Знімки живого стану: snapshotDir = None - вимкнено
+SNAPSHOT_DIR = getattr(settings, "snapshotDir", None)
+state_snapshotter = StateSnapshotter(SNAPSHOT_DIR, value_vault, events_vault,
+                                     getattr(settings, "snapshotInterval", 10.0)) if SNAPSHOT_DIR else None
+
 #app.add_middleware(
 #    CORSMiddleware,
 #    allow_origins=["*"],  # Дозволяє запити з будь-яких джерел
@@ -23,6 +31,52 @@ app = FastAPI()
 #    allow_methods=["*"],  # Дозволяє всі методи (GET, POST, PUT, DELETE тощо)
 #    allow_headers=["*"],  # Дозволяє всі заголовки
 #)
+
+@app.on_event("startup")
+async def startup():
+    # Словник tag <-> Values.id для бінарного протоколу: продюсер може слати кадри ще до {"protocol": "binary"}
+    try:
+        await tag_ids.load()
+    except Exception as e:
+        print(f"Error loading tag ids: {e}")
+    if state_snapshotter:
+        # Стан до перезапуску - щоб HMI не показували порожнечу, поки опитувачі не пройдуть усі теги
+        loaded = state_snapshotter.load()
+        print(f"Loaded state snapshot: {loaded}")
+    if getattr(settings, "persistActualData", False):
+        await measures_writer.start()
+    if not len(value_vault) and getattr(settings, "seedFromMeasures", True):
+        # Знімка немає - беремо останній вимір кожного логованого тегу
+        try:
+            if not measures_writer.logged_tags:
+                await measures_writer.refresh_logged_tags()
+            seeded = await seed_values_from_measures(value_vault, measures_writer.logged_tags)
+            print(f"Seeded {seeded} values from measures")
+        except Exception as e:
+            print(f"Error seeding values from measures: {e}")
+    if state_snapshotter:
+        state_snapshotter.start()
+    if getattr(settings, "retentionEnabled", False):
+        retention_job.start()
+    # "local" - стан лише в цьому процесі; "worker_bus" - для uvicorn --workers N
+    if getattr(settings, "liveStateBackend", "local") == "worker_bus":
+        await values_bus.start()
+        await events_bus.start()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    if measures_writer.is_running:
+        await measures_writer.stop()
+    if retention_job.is_running:
+        await retention_job.stop()
+    for bus in (values_bus, events_bus):
+        if bus.is_running:
+            await bus.stop()
+    if state_snapshotter:
+        await state_snapshotter.stop()
+
+
 @app.get("/", response_class=HTMLResponse)
 async def root():
     html_path = Path("index.html")  # наприклад, у папці "static"
@@ -0,0 +1,109 @@
+#manage.py
+# Службові команди: python manage.py <command> [options]
+import argparse
+import asyncio
+
+from DataBase.database import engine, AsyncSessionLocal, Base
+import DataBase.models  # noqa: F401 - реєструє моделі в Base.metadata
+from DataBase.migrations import migrate, partition_measures, add_future_partitions
+from Routers.rollups import backfill_rollups
+from Routers.retention import RetentionJob
+from Routers.arrow_export import ARROW_FORMATS, write_measures_file
+import settings
+
+
+def parse_ids(value: str | None) -> list[int] | None:
+    if not value:
+        return None
+    return [int(id.strip()) for id in value.split(',') if id.strip()]
+
+
+async def create_tables(args) -> None:
+    # Створює лише відсутні таблиці (існуючі не чіпає)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    print("Tables created")
+
+
+async def run_migrations(args) -> None:
+    async with engine.begin() as conn:
+        done = await migrate(conn)
+    print(f"Applied migrations: {', '.join(done) if done else 'none'}")
+
+
+async def partition(args) -> None:
+    # ALTER TABLE на великій таблиці блокує її на час перебудови - запускати у вікно обслуговування
+    async with engine.begin() as conn:
+        await partition_measures(conn, args.months_ahead)
+    print("measures partitioned by month")
+
+
+async def add_partitions(args) -> None:
+    async with engine.begin() as conn:
+        added = await add_future_partitions(conn, args.months_ahead)
+    print(f"Added partitions: {', '.join(added) if added else 'none'}")
+
+
+async def backfill(args) -> None:
+    async with AsyncSessionLocal() as session:
+        processed = await backfill_rollups(session, parse_ids(args.value_ids), args.start, args.end)
+    print(f"Rollups rebuilt from {processed} measures")
+
+
+async def purge(args) -> None:
+    job = RetentionJob(archive_dir=args.archive_dir or getattr(settings, "archiveDir", None))
+    purged = await job.run_once()
+    print(f"Purged {purged} measures past retention")
+
+
+async def export(args) -> None:
+    rows = await write_measures_file(args.output, parse_ids(args.value_ids), args.start, args.end, args.format)
+    print(f"Exported {rows} measures to {args.output}")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="API_on_python management commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("create_tables", help="Create missing tables").set_defaults(handler=create_tables)
+
+    commands.add_parser("migrate", help="Apply pending schema migrations").set_defaults(handler=run_migrations)
+
+    partition_parser = commands.add_parser("partition_measures", help="Partition measures by month of measureTime")
+    partition_parser.add_argument("--months-ahead", type=int, default=3)
+    partition_parser.set_defaults(handler=partition)
+
+    add_partitions_parser = commands.add_parser("add_partitions", help="Split pmax into partitions for upcoming months")
+    add_partitions_parser.add_argument("--months-ahead", type=int, default=3)
+    add_partitions_parser.set_defaults(handler=add_partitions)
+
+    backfill_parser = commands.add_parser("backfill_rollups", help="Rebuild 1m/1h/1d rollups from raw measures")
+    backfill_parser.add_argument("--value-ids", help="Comma-separated list of value IDs (default: all)")
+    backfill_parser.add_argument("--start", type=int, help="Start time in Unix timestamp")
+    backfill_parser.add_argument("--end", type=int, help="End time in Unix timestamp")
+    backfill_parser.set_defaults(handler=backfill)
+
+    purge_parser = commands.add_parser("purge_measures", help="Apply retentionDays from Values.settings once")
+    purge_parser.add_argument("--archive-dir", help="Archive purged rows here (default: settings.archiveDir)")
+    purge_parser.set_defaults(handler=purge)
+
+    export_parser = commands.add_parser("export_measures", help="Export measures to Parquet or Arrow IPC (needs pyarrow)")
+    export_parser.add_argument("output", help="Output file path")
+    export_parser.add_argument("--value-ids", help="Comma-separated list of value IDs (default: all)")
+    export_parser.add_argument("--start", type=int, help="Start time in Unix timestamp")
+    export_parser.add_argument("--end", type=int, help="End time in Unix timestamp")
+    export_parser.add_argument("--format", choices=list(ARROW_FORMATS), default="parquet")
+    export_parser.set_defaults(handler=export)
+
+    return parser
+
+
+async def run(args) -> None:
+    try:
+        await args.handler(args)
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(run(build_parser().parse_args()))
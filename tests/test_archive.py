@@ -0,0 +1,41 @@
+from DataBase.archive import DAY, archive_rows, day_file, iter_archive_days, read_archive, read_file, write_segment
+
+T0 = 20000 * DAY
+
+
+def test_segment_round_trip_with_delta_encoding(tmp_path):
+    path = str(tmp_path / "seg.mca")
+    rows = [(10, T0 + 5, 1.5), (11, T0 + 5, -2.0), (15, T0 + 100, 1e300), (12, T0 + 90000, 0.0)]
+    write_segment(path, rows)
+    write_segment(path, [(20, T0 + 200, 3.25)])
+    assert read_file(path) == rows + [(20, T0 + 200, 3.25)]
+
+
+def test_archive_rows_splits_by_day_and_value(tmp_path):
+    archive = str(tmp_path)
+    written = archive_rows(archive, [
+        (1, 7, T0 + 10, 1.0), (2, 7, T0 + DAY + 10, 2.0), (3, 8, T0 + 10, 3.0), (4, 7, T0 + 5, 4.0),
+    ])
+    assert written == 4
+    assert read_file(day_file(archive, 7, T0)) == [(4, T0 + 5, 4.0), (1, T0 + 10, 1.0)]
+    assert read_file(day_file(archive, 7, T0 + DAY)) == [(2, T0 + DAY + 10, 2.0)]
+    assert read_file(day_file(archive, 8, T0)) == [(3, T0 + 10, 3.0)]
+
+
+def test_read_archive_dedupes_filters_and_pages(tmp_path):
+    archive = str(tmp_path)
+    rows = [(i, 7, T0 + i * 3600, float(i)) for i in range(1, 49)]
+    archive_rows(archive, rows)
+    # Повторна архівація тих самих рядків (збій між записом і DELETE)
+    archive_rows(archive, rows[:5])
+
+    everything = read_archive(archive, 7)
+    assert [r[0] for r in everything] == list(range(1, 49))
+
+    assert [r[0] for r in read_archive(archive, 7, T0 + 10 * 3600, T0 + 12 * 3600)] == [10, 11, 12]
+    page = read_archive(archive, 7, after=(T0 + 20 * 3600, 20), limit=3)
+    assert [r[0] for r in page] == [21, 22, 23]
+
+    days = list(iter_archive_days(archive, 7))
+    assert [len(d) for d in days] == [23, 24, 1]
+    assert read_archive(None, 7) == [] and read_archive(archive, 99) == []
@@ -0,0 +1,43 @@
+import pytest
+
+# Модуль тягне за собою DataBase.database (sqlalchemy, settings) - без них тести пропускаються
+protocol = pytest.importorskip("ActualDataForUser.BinaryProtocol")
+
+
+def test_pack_unpack_round_trip():
+    registry = protocol.TagIdRegistry()
+    registry.add(5, "plant/t1")
+    registry.add(6, "plant/t2")
+    frame = protocol.pack_sample(5, 1700000000, 1.5) + protocol.pack_sample(6, 1700000001.0, -2)
+    assert len(frame) == 2 * protocol.SAMPLE.size == 40
+    samples, unknown = protocol.unpack_samples(frame, registry)
+    assert samples == [
+        {"tag": "plant/t1", "timestamp": 1700000000, "value": 1.5},
+        {"tag": "plant/t2", "timestamp": 1700000001, "value": -2.0},
+    ]
+    assert unknown == []
+
+
+def test_unknown_ids_are_reported_and_bad_length_rejected():
+    registry = protocol.TagIdRegistry()
+    registry.add(5, "a")
+    frame = protocol.pack_sample(5, 1, 1.0) + protocol.pack_sample(9, 1, 2.0)
+    samples, unknown = protocol.unpack_samples(frame, registry)
+    assert [s["tag"] for s in samples] == ["a"]
+    assert unknown == [9]
+    with pytest.raises(ValueError):
+        protocol.unpack_samples(frame[:-1], registry)
+
+
+def test_registry_add_rename_forget_and_ephemeral_ids():
+    registry = protocol.TagIdRegistry()
+    registry.add(5, "old")
+    registry.add(5, "new")
+    assert registry.tag_to_id == {"new": 5} and registry.get_tag(5) == "new"
+    registry.forget(5)
+    assert registry.tag_to_id == {} and registry.get_tag(5) is None
+
+    first = registry.get_id("not/in/db")
+    assert first >= protocol.EPHEMERAL_ID_START
+    assert registry.get_id("not/in/db") == first
+    assert registry.get_tag(first) == "not/in/db"
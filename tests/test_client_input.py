@@ -0,0 +1,24 @@
+import pytest
+
+from ActualDataForUser.ClientInput import check_int, resume_point
+
+
+def test_resume_point_accepts_integers():
+    assert resume_point({"since": 5, "epoch": 123}) == (5, 123)
+    assert resume_point({"since": 0}) == (0, None)
+
+
+@pytest.mark.parametrize("data", [
+    {"since": "5"}, {"since": None}, {"since": 1.5}, {"since": True}, {"since": -1},
+    {"since": 1, "epoch": "x"},
+])
+def test_resume_point_rejects_bad_input(data):
+    with pytest.raises(ValueError):
+        resume_point(data)
+
+
+def test_check_int_minimum_and_optional():
+    assert check_int("limit", None, 1) is None
+    assert check_int("limit", 3, 1) == 3
+    with pytest.raises(ValueError):
+        check_int("limit", 0, 1)
@@ -0,0 +1,65 @@
+import asyncio
+
+import pytest
+
+from ActualDataForUser.ClientSender import MIN_RATE_MS, ClientSender
+
+
+class StalledWebSocket:
+    # Клієнт, який не читає: send_* не завершується
+    def __init__(self):
+        self.close_code = None
+
+    async def send_text(self, data):
+        await asyncio.Event().wait()
+
+    async def close(self, code=1000):
+        self.close_code = code
+
+
+def test_message_queue_overflow_disconnects_client():
+    async def scenario():
+        websocket = StalledWebSocket()
+        closed = []
+        sender = ClientSender(websocket, str, on_close=closed.append, max_messages=3)
+        for i in range(10):
+            sender.push_message(f"m{i}")
+        assert sender.messages_in_queue <= 3
+        await asyncio.sleep(0.01)
+        assert sender.closed
+        assert websocket.close_code == 1013
+        assert closed == [websocket]
+
+    asyncio.run(scenario())
+
+
+def test_disconnect_policy_keeps_close_task_reference():
+    async def scenario():
+        websocket = StalledWebSocket()
+        sender = ClientSender(websocket, str, max_queue=1, policy="disconnect")
+        sender.push_update({"a": "1"})
+        sender.push_update({"b": "2"})
+        sender.push_update({"c": "3"})
+        assert sender._close_task is not None
+        await sender._close_task
+        assert websocket.close_code == 1013
+
+    asyncio.run(scenario())
+
+
+def test_set_rate_clamps_to_floor_and_rejects_bad_values():
+    async def scenario():
+        sender = ClientSender(StalledWebSocket(), str)
+        sender.set_rate(1)
+        assert sender.max_rate_ms == MIN_RATE_MS
+        sender.set_rate(250.7)
+        assert sender.max_rate_ms == 250
+        for bad in ("fast", -5, float("nan"), True, [100]):
+            with pytest.raises(ValueError):
+                sender.set_rate(bad)
+        assert sender.max_rate_ms == 250
+        sender.set_rate(None)
+        assert sender.max_rate_ms == 0
+        await sender.close()
+
+    asyncio.run(scenario())
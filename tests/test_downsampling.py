@@ -0,0 +1,43 @@
+import math
+
+from Routers.downsampling import downsample, lttb, min_max_buckets
+
+
+def series(n):
+    xs = list(range(n))
+    ys = [math.sin(x / 10) for x in xs]
+    return xs, ys
+
+
+def test_short_series_is_returned_unchanged():
+    xs, ys = series(10)
+    assert lttb(xs, ys, 20) == (xs, ys)
+    assert min_max_buckets(xs, ys, 20) == (xs, ys)
+
+
+def test_lttb_keeps_endpoints_and_point_count():
+    xs, ys = series(1000)
+    out_x, out_y = lttb(xs, ys, 100)
+    assert len(out_x) == len(out_y) == 100
+    assert (out_x[0], out_x[-1]) == (0, 999)
+    assert out_x == sorted(out_x)
+    # Кожна вибрана точка - з вихідного ряду
+    assert all(ys[x] == y for x, y in zip(out_x, out_y))
+
+
+def test_lttb_keeps_a_single_spike():
+    xs = list(range(1000))
+    ys = [0.0] * 1000
+    ys[537] = 100.0
+    out_x, out_y = lttb(xs, ys, 50)
+    assert 537 in out_x
+
+
+def test_min_max_keeps_every_peak_in_time_order():
+    xs, ys = series(1000)
+    ys[123], ys[876] = 50.0, -50.0
+    out_x, out_y = min_max_buckets(xs, ys, 100)
+    assert len(out_x) <= 100
+    assert out_x == sorted(out_x)
+    assert max(out_y) == 50.0 and min(out_y) == -50.0
+    assert downsample(xs, ys, 100, "minmax") == (out_x, out_y)
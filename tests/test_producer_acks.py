@@ -0,0 +1,39 @@
+import json
+
+from ActualDataForUser.ProducerAcks import MAX_LOST_RANGES, ProducerAcks
+
+
+class FakeSender:
+    def __init__(self):
+        self.messages = []
+
+    def push_message(self, message):
+        self.messages.append(message)
+
+
+def test_negotiate_rejects_non_object_options():
+    acks = ProducerAcks(FakeSender())
+    acks.negotiate(True)
+    assert json.loads(acks.sender.messages[-1]) == {"error": "producer options must be an object"}
+    assert acks.mode == "each"
+
+
+def test_check_seq_rejects_non_integer_values():
+    acks = ProducerAcks(FakeSender())
+    assert acks.check_seq(None)
+    assert acks.check_seq(5)
+    for seq in ("5", 1.5, True, 0, -1):
+        assert not acks.check_seq(seq)
+    assert len(acks.sender.messages) == 5
+
+
+def test_lost_ranges_are_merged_after_limit():
+    acks = ProducerAcks(FakeSender())
+    acks.mode = "batched"
+    for seq in range(1, 2 * MAX_LOST_RANGES + 10, 2):
+        acks.received(seq)
+    acks.flush()
+    ack = json.loads(acks.sender.messages[-1])
+    assert len(ack["lost"]) == MAX_LOST_RANGES
+    assert ack["lost"][-1][1] == ack["ack"] - 1
+    assert ack["lost_merged"] is True
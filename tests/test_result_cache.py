@@ -0,0 +1,47 @@
+import asyncio
+
+from Routers.result_cache import ResultCache
+
+
+def test_cancelled_leader_does_not_cancel_waiters():
+    async def scenario():
+        cache = ResultCache()
+        release = asyncio.Event()
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            await release.wait()
+            return b"body"
+
+        leader = asyncio.create_task(cache.get_or_compute("k", None, compute))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(cache.get_or_compute("k", None, compute))
+        await asyncio.sleep(0)
+        leader.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        assert await follower == b"body"
+        assert leader.cancelled()
+        assert calls == [1]
+        assert cache.get("k") == b"body"
+        assert cache.in_flight == {}
+
+    asyncio.run(scenario())
+
+
+def test_compute_error_reaches_every_waiter_and_is_not_cached():
+    async def scenario():
+        cache = ResultCache()
+
+        async def compute():
+            await asyncio.sleep(0)
+            raise ValueError("boom")
+
+        results = await asyncio.gather(*(cache.get_or_compute("k", None, compute) for _ in range(3)),
+                                       return_exceptions=True)
+        assert all(isinstance(r, ValueError) for r in results)
+        assert cache.get("k") is None
+        assert cache.get_stats()["coalesced"] == 2
+
+    asyncio.run(scenario())
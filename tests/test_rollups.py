@@ -0,0 +1,50 @@
+import asyncio
+
+import pytest
+
+# Модуль тягне за собою DataBase (sqlalchemy, settings) - без них тести пропускаються
+rollups = pytest.importorskip("Routers.rollups")
+
+from sqlalchemy.dialects import mysql
+
+
+def row(value_id, t, v):
+    return {"valueId": value_id, "measureTime": t, "measureValue": v}
+
+
+def test_aggregate_rows_per_bucket():
+    rows = [row(1, 125, 3.0), row(1, 61, 5.0), row(1, 60, 1.0), row(1, 119, 2.0), row(2, 60, 9.0)]
+    buckets = {(b["valueId"], b["bucketTime"]): b for b in rollups.aggregate_rows(rows, 60)}
+    assert set(buckets) == {(1, 60), (1, 120), (2, 60)}
+    b = buckets[(1, 60)]
+    assert (b["minValue"], b["maxValue"], b["sumValue"], b["count"]) == (1.0, 5.0, 8.0, 3)
+    assert (b["firstTime"], b["firstValue"], b["lastTime"], b["lastValue"]) == (60, 1.0, 119, 2.0)
+    assert buckets[(1, 120)]["count"] == 1
+
+
+class RecordingSession:
+    def __init__(self):
+        self.statements = []
+
+    async def execute(self, statement):
+        self.statements.append(statement)
+
+
+def test_upsert_merges_with_existing_bucket_in_mysql_order():
+    session = RecordingSession()
+    buckets = rollups.aggregate_rows([row(1, t, float(t)) for t in range(5)], 60)
+    asyncio.run(rollups.upsert_rollup(rollups.MeasuresRollup1m, buckets, session))
+    assert len(session.statements) == 1
+    sql = str(session.statements[0].compile(dialect=mysql.dialect())).replace("`", "")
+    assert "ON DUPLICATE KEY UPDATE" in sql
+    update = sql.split("ON DUPLICATE KEY UPDATE", 1)[1]
+    assert "count = (measures_rollup_1m.count + VALUES(count))" in update
+    # MySQL обчислює присвоєння зліва направо: *Value має йти перед *Time
+    assert update.index("firstValue =") < update.index("firstTime =")
+    assert update.index("lastValue =") < update.index("lastTime =")
+
+
+def test_choose_rollup_picks_coarsest_table_with_enough_points():
+    assert rollups.choose_rollup(0, 3600, 100) is None
+    assert rollups.choose_rollup(0, 100 * 60, 100) is rollups.MeasuresRollup1m
+    assert rollups.choose_rollup(0, 200 * 86400, 100) is rollups.MeasuresRollup1d
@@ -0,0 +1,47 @@
+import pytest
+
+# Модуль тягне за собою DataBase.database (sqlalchemy, settings) - без них тести пропускаються
+snapshot = pytest.importorskip("ActualDataForUser.StateSnapshot")
+
+from ActualDataForUser.ActualValuesData import CompactValuesContainer, HashedValue, ValuesDataContainer
+from ActualDataForUser.EventsData import EventDataContainer
+
+
+@pytest.mark.parametrize("factory", [ValuesDataContainer, CompactValuesContainer])
+def test_values_snapshot_round_trip(tmp_path, factory):
+    path = str(tmp_path / snapshot.VALUES_FILE)
+    source = factory()
+    source.update_values([HashedValue("a", 1, 1.5), HashedValue("plant/b", 2, -3.0)])
+    count, blocks = snapshot.build_values_snapshot(source)
+    snapshot._atomic_write(path, snapshot.MAGIC_VALUES, count, blocks)
+
+    restored = factory()
+    assert snapshot.load_values_snapshot(path, restored) == 2
+    assert restored.get_value("plant/b") == HashedValue("plant/b", 2, -3.0)
+
+
+def test_corrupted_snapshot_fails_crc(tmp_path):
+    path = str(tmp_path / snapshot.VALUES_FILE)
+    source = ValuesDataContainer()
+    source.update_values([HashedValue("a", 1, 1.5)])
+    snapshot._atomic_write(path, snapshot.MAGIC_VALUES, *snapshot.build_values_snapshot(source))
+    with open(path, "r+b") as f:
+        f.seek(snapshot.HEADER.size)
+        f.write(b"\xff")
+    with pytest.raises(ValueError, match="Corrupted"):
+        snapshot.load_values_snapshot(path, ValuesDataContainer())
+
+
+def test_missing_snapshot_loads_nothing(tmp_path):
+    assert snapshot.load_values_snapshot(str(tmp_path / "none.snap"), ValuesDataContainer()) == 0
+
+
+def test_events_snapshot_round_trip(tmp_path):
+    path = str(tmp_path / snapshot.EVENTS_FILE)
+    source = EventDataContainer()
+    source.update_event({"door": {1: 1.0, 2: 0.0}, "alarm": {7: 1.0}})
+    snapshot._atomic_write(path, snapshot.MAGIC_EVENTS, *snapshot.build_events_snapshot(source))
+
+    restored = EventDataContainer()
+    assert snapshot.load_events_snapshot(path, restored) == 2
+    assert restored.get_all_events() == {"door": {1: 1.0, 2: 0.0}, "alarm": {7: 1.0}}
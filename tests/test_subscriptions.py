@@ -0,0 +1,61 @@
+from ActualDataForUser.Subscriptions import SubscriptionIndex, pattern_matches
+
+
+def test_bare_wildcard_matches_every_tag():
+    index = SubscriptionIndex(".")
+    index.subscribe("c1", ["*"])
+    assert index.subscribers("x") == {"c1"}
+    assert index.subscribers("a.b.c") == {"c1"}
+
+
+def test_prefix_wildcard_matches_deeper_tags_only():
+    index = SubscriptionIndex(".")
+    index.subscribe("c1", ["a.*"])
+    assert index.subscribers("a.b") == {"c1"}
+    assert index.subscribers("a.b.c") == {"c1"}
+    assert index.subscribers("a") == set()
+    assert index.subscribers("b.a") == set()
+
+
+def test_mid_segment_wildcard_matches_exactly_one_segment():
+    index = SubscriptionIndex(".")
+    index.subscribe("c1", ["a.*.temp"])
+    assert index.subscribers("a.line1.temp") == {"c1"}
+    assert index.subscribers("a.temp") == set()
+    assert index.subscribers("a.x.y.temp") == set()
+    assert index.subscribers("a.line1.press") == set()
+
+
+def test_exact_and_pattern_subscribers_are_combined():
+    index = SubscriptionIndex(".")
+    index.subscribe("c1", ["a.b"])
+    index.subscribe("c2", ["a.*"])
+    assert index.subscribers("a.b") == {"c1", "c2"}
+
+
+def test_unsubscribe_prunes_trie_nodes():
+    index = SubscriptionIndex(".")
+    index.subscribe("c1", ["a.b.*", "a.*.c", "*"])
+    index.unsubscribe("c1", ["a.b.*", "a.*.c", "*"])
+    assert index.trie.is_empty()
+    assert index.subscribers("a.b.c") == set()
+
+
+def test_remove_client_keeps_other_clients_patterns():
+    index = SubscriptionIndex(".")
+    index.subscribe("c1", ["a.*"])
+    index.subscribe("c2", ["a.*", "b"])
+    index.remove_client("c1")
+    assert index.subscribers("a.x") == {"c2"}
+    assert index.subscribers("b") == {"c2"}
+    index.remove_client("c2")
+    assert index.trie.is_empty()
+    assert index.by_tag == {}
+
+
+def test_pattern_matches_agrees_with_trie():
+    assert pattern_matches("*", "x", ".")
+    assert pattern_matches("a.*", "a.b.c", ".")
+    assert not pattern_matches("a.*", "a", ".")
+    assert pattern_matches("a.*.c", "a.b.c", ".")
+    assert not pattern_matches("a.*.c", "a.b.b.c", ".")
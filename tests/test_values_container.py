@@ -0,0 +1,48 @@
+import pytest
+
+from ActualDataForUser.ActualValuesData import CompactValuesContainer, HashedValue, ValuesDataContainer, is_valid_value
+
+
+@pytest.mark.parametrize("timestamp, value, valid", [
+    (1, 1.5, True), (1.0, 2, True), (1.5, 1.0, False), (True, 1.0, False),
+    ("1", 1.0, False), (1, None, False), (1, "x", False), (1, False, False),
+])
+def test_is_valid_value(timestamp, value, valid):
+    assert is_valid_value(HashedValue("t", timestamp, value)) is valid
+
+
+def test_compact_store_grows_and_reads_back():
+    store = CompactValuesContainer(capacity=2)
+    store.update_values([HashedValue(f"t{i}", i, float(i)) for i in range(5)])
+    store.update_values([HashedValue("t1", 10.0, -1.0)])
+    assert len(store) == 5
+    assert store.get_value("t1") == HashedValue("t1", 10, -1.0)
+    assert store.get_value("missing") is None
+    assert [v.tag for v in store.get_all_values()] == ["t0", "t1", "t2", "t3", "t4"]
+
+
+def test_compact_store_rejects_whole_batch_on_bad_value():
+    store = CompactValuesContainer()
+    store.update_values([HashedValue("a", 1, 1.0)])
+    version = store.version
+    with pytest.raises(ValueError, match="b"):
+        store.update_values([HashedValue("a", 2, 2.0), HashedValue("b", 2, None)])
+    assert store.get_value("a") == HashedValue("a", 1, 1.0)
+    assert store.get_value("b") is None
+    assert store.version == version
+
+
+@pytest.mark.parametrize("factory", [ValuesDataContainer, CompactValuesContainer])
+def test_changed_since_and_snapshot_load_round_trip(factory):
+    store = factory()
+    store.update_values([HashedValue("a", 1, 1.0), HashedValue("b", 1, 2.0)])
+    since = store.version
+    store.update_values([HashedValue("b", 2, 3.0)])
+    assert store.changed_since(since) == [HashedValue("b", 2, 3.0)]
+    assert store.changed_since(since, ["a"]) == []
+
+    tags, timestamps, values = store.snapshot()
+    restored = factory()
+    restored.load(tags, bytes(timestamps), bytes(values))
+    assert sorted(restored.get_all_values(), key=lambda v: v.tag) == \
+        [HashedValue("a", 1, 1.0), HashedValue("b", 2, 3.0)]
@@ -0,0 +1,41 @@
+from ActualDataForUser.ActualValuesData import HashedValue
+from ActualDataForUser.ValuesHistory import ValuesHistory
+
+
+def samples(tag, points):
+    return [HashedValue(tag, t, v) for t, v in points]
+
+
+def test_ring_keeps_last_capacity_samples_in_order():
+    history = ValuesHistory(capacity=3)
+    history.record(samples("a", [(1, 1.0), (2, 2.0), (3, 3.0), (4, 4.0), (5, 5.0)]))
+    assert history.get("a") == {"t": [3, 4, 5], "value": [3.0, 4.0, 5.0]}
+
+
+def test_window_start_and_limit():
+    history = ValuesHistory(capacity=10, window=3)
+    history.record(samples("a", [(t, float(t)) for t in range(1, 11)]))
+    # window=3 від останнього семпла (10) - не старші за 7
+    assert history.get("a")["t"] == [7, 8, 9, 10]
+    assert history.get("a", start=9)["t"] == [9, 10]
+    assert history.get("a", start=1)["t"] == [7, 8, 9, 10]
+    assert history.get("a", limit=2)["t"] == [9, 10]
+    assert history.get("a", limit=0)["t"] == []
+
+
+def test_out_of_order_and_invalid_samples_are_dropped():
+    history = ValuesHistory(capacity=5)
+    history.record(samples("a", [(10, 1.0), (5, 2.0), (10, 3.0), (11.5, 4.0), (12, None), (13, "x")]))
+    assert history.get("a") == {"t": [10, 10], "value": [1.0, 3.0]}
+    assert history.out_of_order == 1
+
+
+def test_disabled_and_filtered_history():
+    disabled = ValuesHistory(capacity=0)
+    disabled.record(samples("a", [(1, 1.0)]))
+    assert not disabled.enabled and disabled.get_tags() == []
+
+    history = ValuesHistory(capacity=2, tags=["plant/*"], separator="/")
+    history.record(samples("plant/t1", [(1, 1.0)]) + samples("other", [(1, 1.0)]))
+    assert history.get_tags() == ["plant/t1"]
+    assert "other" in history.skipped
@@ -0,0 +1,46 @@
+import asyncio
+import os
+
+from ActualDataForUser.WorkerBus import WorkerBus
+
+
+def make_bus(bus_dir, name, state):
+    bus = WorkerBus(str(bus_dir))
+    # Обидві шини в одному процесі - сокети мають різнитися
+    bus.path = os.path.join(str(bus_dir), f"{name}.sock")
+    bus.subscribe("values", state.extend, lambda: [list(state)] if state else [])
+    return bus
+
+
+def test_new_worker_receives_snapshot(tmp_path):
+    async def scenario():
+        old_state, new_state = [["a", 1, 1.0]], []
+        old = make_bus(tmp_path, "old", old_state)
+        await old.start()
+        new = make_bus(tmp_path, "new", new_state)
+        await new.start()
+        for _ in range(50):
+            if new.synced_from:
+                break
+            await asyncio.sleep(0.01)
+        assert new.synced_from == old.path
+        assert new_state == [["a", 1, 1.0]]
+        await new.stop()
+        await old.stop()
+
+    asyncio.run(scenario())
+
+
+def test_bad_datagrams_are_counted_not_raised(tmp_path):
+    bus = make_bus(tmp_path, "w", [])
+    bus._on_datagram(b'{"k": "values", "d"')
+    bus._on_datagram(b'[1, 2]')
+    bus._on_datagram(b'{"d": 1}')
+    assert bus.get_stats()["bad_datagrams"] == 3
+
+    def failing(payload):
+        raise ValueError("bad payload")
+
+    bus.subscribe("events", failing)
+    bus._on_datagram(b'{"k": "events", "d": {}}')
+    assert bus.get_stats()["handler_errors"] == 1